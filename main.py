@@ -1,18 +1,39 @@
 import asyncio
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
 from dotenv import load_dotenv
 from src.telegram_view.view import TelegramView
+from src.telegram_view.interfaces.session_utils import create_bot_session
 from common_utils.schemas import AgentRequest, AgentResponse
 
+try:
+    import uvloop
+except ImportError:  # Optional speedup, not available on Windows
+    uvloop = None
+
 
 def setup_logging():
-    """Configure logging for the application"""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[logging.StreamHandler(), logging.FileHandler("telegram_bot.log")],
-    )
+    """Configure logging for the application
+
+    Records are put on a queue and written by a background listener thread,
+    so console and file I/O never block the event loop.
+    """
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    handlers = [logging.StreamHandler(), logging.FileHandler("telegram_bot.log")]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
 
 async def dummy_callback(request: AgentRequest) -> AgentResponse:
@@ -40,17 +61,23 @@ async def main():
         print("Please set TELEGRAM_BOT_TOKEN in your environment variables")
         return
 
-    # Initialize and run the bot
+    # Initialize and run the bot on a session owned by this process
     logger.info("Starting Telegram bot")
-    bot = TelegramView(dummy_callback)
+    session = create_bot_session()
+    bot = TelegramView(dummy_callback, session=session)
     try:
         await bot.run()
     except Exception as e:
-        logger.error(f"[chat_id:main] Error running bot: {e}")
+        logger.error("[chat_id:main] Error running bot: %s", e)
         raise
+    finally:
+        await bot.aclose()
+        await session.close()
 
 
 if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
@@ -0,0 +1,227 @@
+import logging
+from typing import Callable, Optional
+from aiogram import Dispatcher, types
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.types import ReplyKeyboardMarkup
+from ..messages import get_message, warm_message_cache
+from ..message_types import TEXT_MESSAGE, IncomingMessage
+from common_utils.logging.bug_catcher import report_error_if_enabled
+from .error_reporting import report_error_in_background
+from .session_utils import CONNECTION_LIMIT, create_bot
+from .webhook_utils import serve_webhook, DEFAULT_WEBHOOK_HOST, DEFAULT_WEBHOOK_PORT, DEFAULT_WEBHOOK_PATH
+from .rate_limiter import TelegramSendQueue, UserMessageLimiter
+from .media_group import MediaGroupCollector
+from .work_queue import CallbackWorkerPool, ConcurrencyLimitMiddleware, DuplicateUpdateMiddleware, DEFAULT_CALLBACK_WORKERS, DEFAULT_MAX_CONCURRENT_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+# Seconds a getUpdates call is held open by Telegram while no update arrives
+DEFAULT_POLLING_TIMEOUT = 30
+
+
+class BaseBotInterface:
+    """
+    Bot, dispatcher, send queue and run loop shared by the bot interfaces.
+
+    Subclasses register their handlers in `setup_handlers`, provide the main
+    keyboard, decide what `_record_history` keeps and what `_flush_pending`
+    waits for on shutdown.
+    """
+
+    # Used in error reports to tell the interfaces apart
+    interface_name = "Base"
+
+    def __init__(self, token: str, config, session: Optional[AiohttpSession] = None):
+        """Initialize the Telegram bot interface
+
+        Args:
+            token: Telegram bot token
+            config: Configuration object
+            session: Optional shared session owned by the host process, closed by the host
+        """
+        if not token:
+            raise ValueError("TELEGRAM_BOT_TOKEN is required")
+        # Pool size of the session created here, a session passed in keeps its own
+        connection_limit = getattr(getattr(config, 'view', None), 'connection_limit', CONNECTION_LIMIT)
+        self.bot = create_bot(token, session, connection_limit)
+        self._owns_session = session is None
+        self.send_queue = TelegramSendQueue()
+        self.media_groups = MediaGroupCollector()
+        # Orchestrator callbacks run on a fixed pool of workers
+        callback_workers = getattr(getattr(config, 'view', None), 'callback_workers', DEFAULT_CALLBACK_WORKERS)
+        self.callback_pool = CallbackWorkerPool(callback_workers)
+        self.dp = Dispatcher()
+        # Redelivered updates are dropped before they take a handler slot
+        self.dp.update.outer_middleware(DuplicateUpdateMiddleware())
+        # Updates handled at once, the rest wait before their handlers start
+        max_handlers = getattr(getattr(config, 'view', None), 'max_concurrent_handlers', DEFAULT_MAX_CONCURRENT_HANDLERS)
+        self.dp.update.outer_middleware(ConcurrencyLimitMiddleware(max_handlers))
+        # Messages per user and minute passed to the orchestrator, unlimited when not set
+        user_limit = getattr(getattr(config, 'view', None), 'user_messages_per_minute', None)
+        self.user_limiter = UserMessageLimiter(user_limit) if user_limit else None
+        self.config = config
+        # Error paths look these up on every failure, resolve them before the first message
+        warm_message_cache("error", "unsupported_content", "rate_limited")
+
+    def get_main_keyboard(self) -> ReplyKeyboardMarkup:
+        """Return the keyboard sent with every reply"""
+        raise NotImplementedError
+
+    def setup_handlers(self, handle_message: Callable, config):
+        """Setup message handlers for the Telegram bot"""
+        raise NotImplementedError
+
+    def _record_history(self, chat_id: int, message_type: str, message: str) -> None:
+        """Append a message to the history of a chat, if the interface keeps one"""
+
+    async def _flush_pending(self) -> None:
+        """Finish background work the interface queued, before shutdown"""
+
+    async def send_message(self, chat_id: int, message: str) -> None:
+        """Send a message via Telegram bot"""
+        try:
+            logger.debug("Sending message to %s: %.50s...", chat_id, message)
+            await self.send_queue.enqueue(lambda: self.bot.send_message(chat_id=chat_id, text=message), chat_id)
+            # Add AI response to chat history for issue reporting
+            self._record_history(chat_id, "ai", message)
+        except Exception as e:
+            # Report error using the centralized bug catcher function
+            report_error_in_background(
+                self.config,
+                e,
+                f"Error sending message ({self.interface_name} Interface)",
+                {"chat_id": chat_id, "message_length": len(message)}
+            )
+
+            logger.error("[chat_id:%s] Error sending message: %s", chat_id, e, exc_info=True)
+            raise
+
+    async def _answer(self, message: types.Message, text: str, reply_markup=None) -> None:
+        """Reply to a message through the rate-limited send queue"""
+        await self.send_queue.enqueue(lambda: message.answer(text, reply_markup=reply_markup), message.chat.id)
+
+    async def _send_error_message(self, message: types.Message, language_code: str):
+        """Send an error message to the user"""
+        error_message = get_message("error", language_code)
+        await self._answer(message, error_message, self.get_main_keyboard())
+        self._record_history(message.chat.id, "ai", error_message)
+
+    async def _send_unsupported_content_message(self, message: types.Message, language_code: str):
+        """Send a message for unsupported content types"""
+        unsupported_message = get_message("unsupported_content", language_code)
+        await self._answer(message, unsupported_message, self.get_main_keyboard())
+        self._record_history(message.chat.id, "ai", unsupported_message)
+
+    async def _is_rate_limited(self, message: types.Message) -> bool:
+        """Count a message towards its user's limit, telling the user once when it is exceeded
+
+        Called before any media of the message is resolved, so messages over the
+        limit cost no download or encoding.
+        """
+        if self.user_limiter is None:
+            return False
+        user_id = message.from_user.id
+        over_limit = self.user_limiter.hit(user_id)
+        if not over_limit:
+            return False
+        # Nothing is coming for this message, so no "typing" either
+        self.send_queue.cancel_chat_action(message.chat.id)
+        if over_limit == 1:
+            logger.info("[chat_id:%s] User %s is over the message limit", message.chat.id, user_id)
+            language_code = message.from_user.language_code or "en"
+            await self._answer(message, get_message("rate_limited", language_code), self.get_main_keyboard())
+        return True
+
+    async def _dispatch(self, handle_message: Callable, message: types.Message, message_data: IncomingMessage) -> None:
+        """Call the orchestrator callback and DO NOT return response"""
+        try:
+            await handle_message(message_data)
+        except Exception as e:
+            # Report error using the centralized bug catcher function
+            report_error_in_background(
+                self.config,
+                e,
+                f"Error in orchestrator callback ({self.interface_name} Interface)",
+                {"message_type": message_data.type, "user_id": message_data.user_id}
+            )
+
+            logger.error("[chat_id:%s] Error in orchestrator callback: %s", message_data.chat_id, e, exc_info=True)
+            if message_data.type == TEXT_MESSAGE:
+                # Only show error to user for text messages
+                error_message = get_message("error", message_data.language_code)
+                await self._answer(message, error_message, self.get_main_keyboard())
+
+    async def run(self):
+        """Run the telegram bot"""
+        try:
+            # Fetch bot info and log the bot name
+            bot_info = await self.bot.get_me()
+            logger.info("Starting Telegram bot: @%s (%s)", bot_info.username, bot_info.first_name)
+            # Long polls return every pending update in one response, and only the
+            # update types some handler is registered for are requested
+            polling_timeout = getattr(getattr(self.config, 'view', None), 'polling_timeout', DEFAULT_POLLING_TIMEOUT)
+            await self.dp.start_polling(
+                self.bot,
+                polling_timeout=polling_timeout,
+                allowed_updates=self.dp.resolve_used_update_types(),
+            )
+        except Exception as e:
+            # Report error using the centralized bug catcher function
+            report_error_if_enabled(
+                self.config,
+                e,
+                f"Critical error in telegram bot polling ({self.interface_name} Interface)",
+                {"bot_token_configured": bool(self.bot.token)}
+            )
+
+            logger.error("[chat_id:bot] Error running telegram bot: %s", e, exc_info=True)
+            raise
+        finally:
+            await self.callback_pool.stop()
+            await self._flush_pending()
+            if self._owns_session:
+                await self.aclose()
+
+    async def run_webhook(
+        self,
+        url: str,
+        host: str = DEFAULT_WEBHOOK_HOST,
+        port: int = DEFAULT_WEBHOOK_PORT,
+        path: str = DEFAULT_WEBHOOK_PATH,
+        secret_token: Optional[str] = None,
+    ):
+        """Run the telegram bot on webhook updates instead of polling
+
+        Args:
+            url: Public HTTPS URL Telegram should post updates to
+            host: Interface the local server binds to
+            port: Port the local server listens on
+            path: Route of the update endpoint
+            secret_token: Optional secret Telegram sends in every request header
+        """
+        try:
+            bot_info = await self.bot.get_me()
+            logger.info("Starting Telegram bot webhook: @%s (%s)", bot_info.username, bot_info.first_name)
+            await serve_webhook(self.bot, self.dp, url, host, port, path, secret_token)
+        except Exception as e:
+            # Report error using the centralized bug catcher function
+            report_error_if_enabled(
+                self.config,
+                e,
+                f"Critical error in telegram bot webhook ({self.interface_name} Interface)",
+                {"bot_token_configured": bool(self.bot.token)}
+            )
+
+            logger.error("[chat_id:bot] Error running telegram bot webhook: %s", e, exc_info=True)
+            raise
+        finally:
+            await self.callback_pool.stop()
+            await self._flush_pending()
+            if self._owns_session:
+                await self.aclose()
+
+    async def aclose(self):
+        """Finish pending background work and close the bot's HTTP session, unless the host owns it"""
+        await self._flush_pending()
+        if self._owns_session:
+            await self.bot.session.close()
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from binascii import b2a_base64
+from aiogram import Bot
+from typing import Tuple
+
+logger = logging.getLogger(__name__)
+
+# Payloads above this size are finalized in a worker thread instead of on the event loop
+THREAD_OFFLOAD_THRESHOLD = 64 * 1024
+
+
+class Base64StreamWriter:
+    """
+    Writable sink that base64-encodes data chunk by chunk as it is downloaded.
+
+    aiogram's `download_file` calls `write()` for every chunk it receives, so the
+    raw file never has to be held in memory as a whole - only the encoded output
+    and a residue of at most 2 bytes that could not yet be encoded.
+    """
+
+    def __init__(self):
+        self._encoded = bytearray()
+        self._residue = b""
+        self.size = 0
+
+    def write(self, chunk: bytes) -> int:
+        """Encode every complete 3-byte group of the chunk, keeping the remainder for later."""
+        self.size += len(chunk)
+        data = self._residue + chunk if self._residue else chunk
+        aligned = len(data) - len(data) % 3
+        self._encoded += b2a_base64(memoryview(data)[:aligned], newline=False)
+        self._residue = bytes(data[aligned:])
+        return len(chunk)
+
+    def flush(self) -> None:
+        """No-op, required by aiogram's binary destination protocol."""
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """No-op, the encoded output cannot be rewound."""
+        return 0
+
+    def getvalue(self) -> str:
+        """Encode the remaining tail and return the complete base64 string."""
+        if self._residue:
+            self._encoded += b2a_base64(self._residue, newline=False)
+            self._residue = b""
+        return self._encoded.decode("ascii")
+
+
+class BytearrayWriter:
+    """
+    Writable sink that appends downloaded chunks to a bytearray.
+
+    Unlike BytesIO + getvalue(), the collected data is used in place without a
+    final copy of the whole payload.
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, chunk: bytes) -> int:
+        """Append the chunk to the buffer."""
+        self.data += chunk
+        return len(chunk)
+
+    def flush(self) -> None:
+        """No-op, required by aiogram's binary destination protocol."""
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        """No-op, the buffer is only ever appended to."""
+        return 0
+
+
+async def download_as_bytes(bot: Bot, file_path: str) -> bytearray:
+    """
+    Downloads a Telegram file into memory without an intermediate BytesIO copy.
+
+    Args:
+        bot: The aiogram Bot instance.
+        file_path: The Telegram file path returned by `bot.get_file`.
+
+    Returns:
+        The file content as a bytearray.
+    """
+    sink = BytearrayWriter()
+    await bot.download_file(file_path, destination=sink, seek=False)
+    return sink.data
+
+
+async def download_as_base64(bot: Bot, file_path: str) -> Tuple[str, int]:
+    """
+    Downloads a Telegram file and base64-encodes it while streaming.
+
+    Args:
+        bot: The aiogram Bot instance.
+        file_path: The Telegram file path returned by `bot.get_file`.
+
+    Returns:
+        Tuple of (base64_data, size_in_bytes).
+    """
+    sink = Base64StreamWriter()
+    await bot.download_file(file_path, destination=sink, seek=False)
+
+    if sink.size > THREAD_OFFLOAD_THRESHOLD:
+        # Decoding a multi-megabyte buffer would stall every other chat
+        return await asyncio.to_thread(sink.getvalue), sink.size
+    return sink.getvalue(), sink.size
@@ -0,0 +1,33 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional, Set
+from common_utils.logging.bug_catcher import report_error_if_enabled
+
+logger = logging.getLogger(__name__)
+
+# Strong references to reports still running, so they are not garbage collected
+_pending_reports: Set[asyncio.Task] = set()
+
+
+def report_error_in_background(config, error: Exception, context: str, extra: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Report an error without holding up the handler that caught it.
+
+    `report_error_if_enabled` may do blocking network I/O to the bug tracker,
+    so it runs in a worker thread while the handler goes on to answer the user.
+
+    Args:
+        config: Configuration object passed through to the bug catcher
+        error: The caught exception
+        context: Short description of where the error happened
+        extra: Optional details attached to the report
+    """
+    task = asyncio.create_task(asyncio.to_thread(report_error_if_enabled, config, error, context, extra))
+    _pending_reports.add(task)
+    task.add_done_callback(_report_done)
+
+
+def _report_done(task: asyncio.Task) -> None:
+    _pending_reports.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.warning("Failed to report error: %s", task.exception())
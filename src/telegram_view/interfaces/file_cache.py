@@ -0,0 +1,65 @@
+import logging
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Tuple
+from aiogram import Bot
+from aiogram.types import File
+
+logger = logging.getLogger(__name__)
+
+# Telegram guarantees a file_path stays downloadable for at least 1 hour
+FILE_INFO_TTL = 50 * 60
+FILE_INFO_CACHE_SIZE = 1024
+
+_file_info_cache: "OrderedDict[str, Tuple[File, float]]" = OrderedDict()
+
+
+async def cached_get_file(bot: Bot, file_id: str) -> File:
+    """
+    Get file info from Telegram, reusing a recent result for the same file_id.
+
+    Handlers often need the same file twice (e.g. as a URL and as an upload),
+    so this saves a getFile round-trip. Entries expire before the file_path
+    does and the least recently used entry is evicted once the cache is full.
+    No lock is needed since everything runs on a single event loop.
+
+    Args:
+        bot: The aiogram Bot instance.
+        file_id: The Telegram file_id to resolve.
+
+    Returns:
+        The File object returned by `bot.get_file`.
+    """
+    now = time.monotonic()
+    cached = _file_info_cache.get(file_id)
+    if cached and cached[1] > now:
+        _file_info_cache.move_to_end(file_id)
+        return cached[0]
+
+    file_info = await bot.get_file(file_id)
+    _file_info_cache[file_id] = (file_info, now + FILE_INFO_TTL)
+    _file_info_cache.move_to_end(file_id)
+    if len(_file_info_cache) > FILE_INFO_CACHE_SIZE:
+        _file_info_cache.popitem(last=False)
+    return file_info
+
+
+@lru_cache(maxsize=4)
+def _download_url_prefix(token: str) -> str:
+    """Build the file download URL prefix once per bot token"""
+    return f"https://api.telegram.org/file/bot{token}/"
+
+
+def get_download_url(bot: Bot, file_path: str) -> str:
+    """
+    Build the download URL for a Telegram file path.
+
+    Args:
+        bot: The aiogram Bot instance.
+        file_path: The file path returned by `bot.get_file`.
+
+    Returns:
+        The URL in the format https://api.telegram.org/file/bot<token>/<file_path>
+    """
+    return _download_url_prefix(bot.token) + file_path
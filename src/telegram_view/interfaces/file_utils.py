@@ -1,20 +1,43 @@
-import base64
-import io
+import asyncio
 import logging
 from aiogram import Bot, types
-from typing import Optional, Tuple
+from typing import Literal, Optional, Tuple
 
 from agent_db.utils import get_s3_uploader
+from .encoding_utils import download_as_base64, download_as_bytes
+from .file_cache import cached_get_file, get_download_url
 
 logger = logging.getLogger(__name__)
 
 # Supported document MIME types
-SUPPORTED_DOCUMENT_MIMES = {
+SUPPORTED_DOCUMENT_MIMES = frozenset({
     "application/pdf",
     "application/msword",
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
     "text/plain",
-}
+})
+
+# Bot API getFile refuses files above 20 MB, so larger uploads cannot be fetched at all
+MAX_DOWNLOAD_SIZE = 20 * 1024 * 1024
+
+# Where the content handed to the agent lives
+FileSource = Literal["s3", "url", "b64"]
+
+
+async def _transfer_to_s3(
+    bot: Bot, uploader, file_id: str, filename: str, mime_type: str, chat_id: str
+) -> Optional[str]:
+    """
+    Downloads a Telegram file and uploads it to S3.
+
+    Returns:
+        The S3 URL, or None if the upload failed.
+    """
+    file_info = await cached_get_file(bot, file_id)
+    file_bytes = await download_as_bytes(bot, file_info.file_path)
+    logger.debug("Downloaded %s from Telegram, size: %s bytes", filename, len(file_bytes))
+    # upload_bytes is a blocking S3 call, run it in a worker thread so other updates keep flowing
+    return await asyncio.to_thread(uploader.upload_bytes, file_bytes, filename, mime_type, chat_id)
 
 
 async def get_file_as_url(bot: Bot, message: types.Message) -> Optional[Tuple[str, str]]:
@@ -36,18 +59,18 @@ async def get_file_as_url(bot: Bot, message: types.Message) -> Optional[Tuple[st
         document = message.document
         mime_type = document.mime_type or "application/octet-stream"
         
-        file_info = await bot.get_file(document.file_id)
+        file_info = await cached_get_file(bot, document.file_id)
         
         if not file_info.file_path:
             logger.error("No file_path received from Telegram for document")
             return None
 
-        download_url = f"https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}"
-        logger.debug(f"Document URL: {download_url}, MIME: {mime_type}")
+        download_url = get_download_url(bot, file_info.file_path)
+        logger.debug("Document URL: %s, MIME: %s", download_url, mime_type)
         return (download_url, mime_type)
 
     except Exception as e:
-        logger.error(f"Failed to get document URL: {e}")
+        logger.error("Failed to get document URL: %s", e)
         return None
 
 
@@ -69,18 +92,14 @@ async def get_file_as_base64(bot: Bot, message: types.Message) -> Optional[Tuple
         document = message.document
         mime_type = document.mime_type or "application/octet-stream"
         
-        file_info = await bot.get_file(document.file_id)
-
-        file_data_io = io.BytesIO()
-        await bot.download_file(file_info.file_path, destination=file_data_io)
-        file_data = file_data_io.getvalue()
+        file_info = await cached_get_file(bot, document.file_id)
 
-        base64_data = base64.b64encode(file_data).decode("utf-8")
-        logger.debug(f"Document encoded to base64, MIME: {mime_type}, size: {len(file_data)} bytes")
+        base64_data, size = await download_as_base64(bot, file_info.file_path)
+        logger.debug("Document encoded to base64, MIME: %s, size: %s bytes", mime_type, size)
         return (base64_data, mime_type)
 
     except Exception as e:
-        logger.error(f"Failed to process document and convert to base64: {e}")
+        logger.error("Failed to process document and convert to base64: %s", e)
         return None
 
 
@@ -103,18 +122,18 @@ async def get_audio_as_url(bot: Bot, message: types.Message) -> Optional[Tuple[s
     try:
         mime_type = getattr(audio_obj, 'mime_type', None) or "audio/ogg"
         
-        file_info = await bot.get_file(audio_obj.file_id)
+        file_info = await cached_get_file(bot, audio_obj.file_id)
         
         if not file_info.file_path:
             logger.error("No file_path received from Telegram for audio")
             return None
 
-        download_url = f"https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}"
-        logger.debug(f"Audio URL: {download_url}, MIME: {mime_type}")
+        download_url = get_download_url(bot, file_info.file_path)
+        logger.debug("Audio URL: %s, MIME: %s", download_url, mime_type)
         return (download_url, mime_type)
 
     except Exception as e:
-        logger.error(f"Failed to get audio URL: {e}")
+        logger.error("Failed to get audio URL: %s", e)
         return None
 
 
@@ -136,32 +155,35 @@ async def get_audio_as_base64(bot: Bot, message: types.Message) -> Optional[Tupl
     try:
         mime_type = getattr(audio_obj, 'mime_type', None) or "audio/ogg"
         
-        file_info = await bot.get_file(audio_obj.file_id)
+        file_info = await cached_get_file(bot, audio_obj.file_id)
 
-        file_data_io = io.BytesIO()
-        await bot.download_file(file_info.file_path, destination=file_data_io)
-        file_data = file_data_io.getvalue()
-
-        base64_data = base64.b64encode(file_data).decode("utf-8")
-        logger.debug(f"Audio encoded to base64, MIME: {mime_type}, size: {len(file_data)} bytes")
+        base64_data, size = await download_as_base64(bot, file_info.file_path)
+        logger.debug("Audio encoded to base64, MIME: %s, size: %s bytes", mime_type, size)
         return (base64_data, mime_type)
 
     except Exception as e:
-        logger.error(f"Failed to process audio and convert to base64: {e}")
+        logger.error("Failed to process audio and convert to base64: %s", e)
         return None
 
 
 def is_supported_document(message: types.Message) -> bool:
-    """Check if the document type is supported."""
-    if not message.document:
+    """Check if the document type is supported, ignoring MIME parameters such as charset."""
+    if not message.document or not message.document.mime_type:
         return False
-    mime_type = message.document.mime_type or ""
+    mime_type = message.document.mime_type.partition(";")[0].strip().lower()
     return mime_type in SUPPORTED_DOCUMENT_MIMES
 
 
+def is_within_download_limit(message: types.Message) -> bool:
+    """Check the declared size of a document/audio/voice before spending a download on it."""
+    file_obj = message.document or message.voice or message.audio
+    file_size = getattr(file_obj, 'file_size', None) if file_obj else None
+    return file_size is None or file_size <= MAX_DOWNLOAD_SIZE
+
+
 async def upload_document_to_s3(bot: Bot, message: types.Message, chat_id: str) -> Optional[Tuple[str, str]]:
     """
-    Downloads a document from Telegram and uploads it to S3.
+    Transfers a document from Telegram to S3.
     
     Args:
         bot: The aiogram Bot instance.
@@ -175,38 +197,30 @@ async def upload_document_to_s3(bot: Bot, message: types.Message, chat_id: str)
         return None
 
     try:
-        document = message.document
-        mime_type = document.mime_type or "application/octet-stream"
-        filename = document.file_name or "document"
-
-        # Download file from Telegram
-        file_info = await bot.get_file(document.file_id)
-        file_data_io = io.BytesIO()
-        await bot.download_file(file_info.file_path, destination=file_data_io)
-        file_bytes = file_data_io.getvalue()
-
-        logger.debug(f"Downloaded document from Telegram: {filename}, size: {len(file_bytes)} bytes")
-
-        # Upload to S3
+        # Check S3 before downloading anything
         uploader = get_s3_uploader()
         if not uploader.is_enabled:
-            logger.warning("S3 not enabled, falling back to base64")
+            logger.debug("S3 not enabled, skipping upload")
             return None
 
-        s3_url = uploader.upload_bytes(file_bytes, filename, mime_type, chat_id)
+        document = message.document
+        mime_type = document.mime_type or "application/octet-stream"
+        filename = document.file_name or "document"
+
+        s3_url = await _transfer_to_s3(bot, uploader, document.file_id, filename, mime_type, chat_id)
         if s3_url:
-            logger.info(f"Uploaded document to S3: {s3_url}")
+            logger.info("Uploaded document to S3: %s", s3_url)
             return (s3_url, mime_type)
         return None
 
     except Exception as e:
-        logger.error(f"Failed to upload document to S3: {e}")
+        logger.error("Failed to upload document to S3: %s", e)
         return None
 
 
 async def upload_audio_to_s3(bot: Bot, message: types.Message, chat_id: str) -> Optional[Tuple[str, str]]:
     """
-    Downloads audio/voice from Telegram and uploads it to S3.
+    Transfers audio/voice from Telegram to S3.
     
     Args:
         bot: The aiogram Bot instance.
@@ -221,30 +235,60 @@ async def upload_audio_to_s3(bot: Bot, message: types.Message, chat_id: str) ->
         return None
 
     try:
-        mime_type = getattr(audio_obj, 'mime_type', None) or "audio/ogg"
-        filename = getattr(audio_obj, 'file_name', None) or "audio.ogg"
-
-        # Download file from Telegram
-        file_info = await bot.get_file(audio_obj.file_id)
-        file_data_io = io.BytesIO()
-        await bot.download_file(file_info.file_path, destination=file_data_io)
-        file_bytes = file_data_io.getvalue()
-
-        logger.debug(f"Downloaded audio from Telegram: {filename}, size: {len(file_bytes)} bytes")
-
-        # Upload to S3
+        # Check S3 before downloading anything
         uploader = get_s3_uploader()
         if not uploader.is_enabled:
-            logger.warning("S3 not enabled, falling back to base64")
+            logger.debug("S3 not enabled, skipping upload")
             return None
 
-        s3_url = uploader.upload_bytes(file_bytes, filename, mime_type, chat_id)
+        mime_type = getattr(audio_obj, 'mime_type', None) or "audio/ogg"
+        filename = getattr(audio_obj, 'file_name', None) or "audio.ogg"
+
+        s3_url = await _transfer_to_s3(bot, uploader, audio_obj.file_id, filename, mime_type, chat_id)
         if s3_url:
-            logger.info(f"Uploaded audio to S3: {s3_url}")
+            logger.info("Uploaded audio to S3: %s", s3_url)
             return (s3_url, mime_type)
         return None
 
     except Exception as e:
-        logger.error(f"Failed to upload audio to S3: {e}")
+        logger.error("Failed to upload audio to S3: %s", e)
         return None
 
+
+async def get_file_for_agent(
+    bot: Bot, message: types.Message, chat_id: str, prefer: str = "url"
+) -> Optional[Tuple[str, str, FileSource]]:
+    """
+    Gets a document or audio file in the cheapest form the agent accepts.
+
+    With prefer="url" the file is uploaded to S3 when enabled, otherwise the
+    Telegram download URL is used; base64 is only the last resort. With
+    prefer="base64" the content is always embedded inline, for consumers that
+    need the bytes to outlive the 1 hour Telegram URL.
+
+    Args:
+        bot: The aiogram Bot instance.
+        message: The message object containing a document, voice or audio.
+        chat_id: Chat ID for organizing files in S3.
+        prefer: Either "url" or "base64".
+
+    Returns:
+        Tuple of (data, mime_type, source), or None if no file or error.
+    """
+    if message.document:
+        upload_to_s3, get_as_url, get_as_base64 = upload_document_to_s3, get_file_as_url, get_file_as_base64
+    else:
+        upload_to_s3, get_as_url, get_as_base64 = upload_audio_to_s3, get_audio_as_url, get_audio_as_base64
+
+    if prefer == "url":
+        result = await upload_to_s3(bot, message, chat_id)
+        if result:
+            return (*result, "s3")
+        result = await get_as_url(bot, message)
+        if result:
+            return (*result, "url")
+
+    result = await get_as_base64(bot, message)
+    if result:
+        return (*result, "b64")
+    return None
@@ -1,11 +1,16 @@
-import base64
-import io
+import asyncio
 import logging
 from aiogram import Bot, types
-from typing import Optional
+from typing import List, Optional
+
+from .encoding_utils import download_as_base64
+from .file_cache import cached_get_file, get_download_url
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of photos of one album resolved at the same time
+MAX_CONCURRENT_IMAGE_REQUESTS = 8
+
 
 async def get_image_as_base64(bot: Bot, message: types.Message) -> Optional[str]:
     """
@@ -25,19 +30,14 @@ async def get_image_as_base64(bot: Bot, message: types.Message) -> Optional[str]
     try:
         # Get the highest resolution photo
         highest_res_photo = message.photo[-1]
-        file_info = await bot.get_file(highest_res_photo.file_id)
+        file_info = await cached_get_file(bot, highest_res_photo.file_id)
 
-        # Download the file into an in-memory buffer
-        image_data_io = io.BytesIO()
-        await bot.download_file(file_info.file_path, destination=image_data_io)
-        image_data = image_data_io.getvalue()
-
-        # Encode the image data to base64
-        base64_image = base64.b64encode(image_data).decode("utf-8")
+        # Download and encode the file chunk by chunk
+        base64_image, _ = await download_as_base64(bot, file_info.file_path)
         return base64_image
 
     except Exception as e:
-        logger.error(f"Failed to process image and convert to base64: {e}")
+        logger.error("Failed to process image and convert to base64: %s", e)
         return None
 
 
@@ -59,18 +59,37 @@ async def get_image_as_url(bot: Bot, message: types.Message) -> Optional[str]:
     try:
         # Get the highest resolution photo
         highest_res_photo = message.photo[-1]
-        file_info = await bot.get_file(highest_res_photo.file_id)
+        file_info = await cached_get_file(bot, highest_res_photo.file_id)
         
         if not file_info.file_path:
             logger.error("No file_path received from Telegram")
             return None
 
         # Construct the download URL
-        # Format: https://api.telegram.org/file/bot<token>/<file_path>
-        download_url = f"https://api.telegram.org/file/bot{bot.token}/{file_info.file_path}"
-        logger.debug(f"Download URL: {download_url}")
+        download_url = get_download_url(bot, file_info.file_path)
+        logger.debug("Download URL: %s", download_url)
         return download_url
 
     except Exception as e:
-        logger.error(f"Failed to get image URL: {e}")
-        return None 
\ No newline at end of file
+        logger.error("Failed to get image URL: %s", e)
+        return None
+
+
+async def get_images_as_urls(bot: Bot, messages: List[types.Message]) -> List[Optional[str]]:
+    """
+    Gets the download URLs for the photos of several messages concurrently.
+
+    Args:
+        bot: The aiogram Bot instance.
+        messages: The message objects containing the photos, e.g. one album.
+
+    Returns:
+        A list with the download URL (or None) for each message, in the same order.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_IMAGE_REQUESTS)
+
+    async def resolve(message: types.Message) -> Optional[str]:
+        async with semaphore:
+            return await get_image_as_url(bot, message)
+
+    return await asyncio.gather(*(resolve(message) for message in messages))
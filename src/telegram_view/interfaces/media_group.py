@@ -0,0 +1,46 @@
+import asyncio
+import logging
+from typing import Dict, List, Optional
+from aiogram import types
+
+logger = logging.getLogger(__name__)
+
+# Telegram delivers the messages of an album as separate updates within a few hundred ms
+MEDIA_GROUP_DEBOUNCE = 0.3
+
+
+class MediaGroupCollector:
+    """
+    Collects the messages of a media group (album) so they can be handled together.
+
+    Every message of the group waits for the debounce interval; only the handler
+    whose message arrived last gets the complete group back, the others get None.
+    """
+
+    def __init__(self, debounce: float = MEDIA_GROUP_DEBOUNCE):
+        self._debounce = debounce
+        self._groups: Dict[str, List[types.Message]] = {}
+
+    async def collect(self, message: types.Message) -> Optional[List[types.Message]]:
+        """
+        Add a message to its media group and wait for the rest of the group.
+
+        Args:
+            message: A message with a media_group_id.
+
+        Returns:
+            All messages of the group ordered by message_id, or None if a later
+            message of the same group will handle it.
+        """
+        group_id = message.media_group_id
+        group = self._groups.setdefault(group_id, [])
+        group.append(message)
+        size = len(group)
+
+        await asyncio.sleep(self._debounce)
+        if len(group) != size:
+            return None
+
+        del self._groups[group_id]
+        logger.debug("Collected media group %s with %s messages", group_id, size)
+        return sorted(group, key=lambda m: m.message_id)
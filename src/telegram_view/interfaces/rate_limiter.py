@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Telegram Bot API allows about 30 messages per second across all chats
+TELEGRAM_MESSAGES_PER_SECOND = 30
+# and about one message per second in a single chat, with short bursts tolerated
+CHAT_MESSAGES_PER_SECOND = 1
+CHAT_BURST = 3
+# Groups and channels (negative chat ids) are limited to about 20 messages per minute
+GROUP_MESSAGES_PER_SECOND = 20 / 60
+# Per-chat buckets kept for recently active chats only
+CHAT_LIMITER_CACHE_SIZE = 10_000
+# A "typing" action is shown for up to 5 seconds, refreshing it sooner is wasted quota
+TYPING_ACTION_INTERVAL = 4.0
+# Replies sent sooner than this after a message never show "typing"
+TYPING_ACTION_DELAY = 0.3
+# Window over which incoming messages of a user are counted
+USER_MESSAGE_WINDOW = 60
+
+
+class TokenBucket:
+    """Async token bucket: `acquire()` waits until a token is available, in FIFO order"""
+
+    def __init__(self, rate: float, capacity: int = None):
+        self._rate = rate
+        self._capacity = capacity or int(rate)
+        self._tokens = float(self._capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Take one token, sleeping until the bucket has refilled enough"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+
+
+class TelegramSendQueue:
+    """
+    Rate-limited gateway for outbound Telegram calls.
+
+    Every call takes a token from a bucket refilled at Telegram's global cap, so
+    bursts are smoothed out instead of being answered with 429s. Messages to a
+    chat also take a token from that chat's bucket first. A 429 that still
+    happens is retried once `retry_after` has elapsed.
+    """
+
+    def __init__(self, rate: float = TELEGRAM_MESSAGES_PER_SECOND, typing_interval: float = TYPING_ACTION_INTERVAL):
+        self._bucket = TokenBucket(rate)
+        self._chat_buckets: "OrderedDict[int, TokenBucket]" = OrderedDict()
+        self._typing_interval = typing_interval
+        self._last_typing: Dict[int, float] = {}
+        # Delayed chat actions per chat, cancelled when a message reaches the chat first
+        self._pending_actions: Dict[int, asyncio.Task] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        """Get the bucket of a chat, evicting the least recently used one when full"""
+        # The orchestrator passes chat ids as strings, handlers as ints
+        chat_id = int(chat_id)
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            rate = GROUP_MESSAGES_PER_SECOND if chat_id < 0 else CHAT_MESSAGES_PER_SECOND
+            bucket = self._chat_buckets[chat_id] = TokenBucket(rate, CHAT_BURST)
+            if len(self._chat_buckets) > CHAT_LIMITER_CACHE_SIZE:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def enqueue(self, call: Callable[[], Awaitable[T]], chat_id: Optional[int] = None) -> T:
+        """
+        Run an outbound call once a send token is available.
+
+        Args:
+            call: Zero-argument function creating the API coroutine, called again on retry
+            chat_id: Chat the message goes to, also applies that chat's limit when given
+
+        Returns:
+            The result of the API call
+        """
+        if chat_id is not None:
+            # The message itself replaces a "typing" indicator that has not been sent yet
+            self.cancel_chat_action(chat_id)
+            await self._chat_bucket(chat_id).acquire()
+        await self._bucket.acquire()
+        while True:
+            try:
+                return await call()
+            except TelegramRetryAfter as e:
+                logger.warning("Telegram flood control, retrying in %ss", e.retry_after)
+                await asyncio.sleep(e.retry_after)
+
+    async def send_chat_action(self, bot: Bot, chat_id: int, action: str = "typing") -> None:
+        """Send a chat action, skipping it if the same chat got one within the typing interval"""
+        now = time.monotonic()
+        if now - self._last_typing.get(chat_id, 0.0) < self._typing_interval:
+            return
+        self._last_typing[chat_id] = now
+        if len(self._last_typing) > 10_000:
+            self._last_typing = {
+                cid: ts for cid, ts in self._last_typing.items() if now - ts < self._typing_interval
+            }
+        await self.enqueue(lambda: bot.send_chat_action(chat_id, action))
+
+    def start_chat_action(self, bot: Bot, chat_id: int, action: str = "typing", delay: float = TYPING_ACTION_DELAY) -> None:
+        """
+        Send a chat action in the background once `delay` has passed.
+
+        The caller does not wait for the round-trip, and if a message is sent to
+        the chat before the delay is over the action is dropped, so fast replies
+        cost no extra API call.
+        """
+        chat_id = int(chat_id)
+        pending = self._pending_actions.get(chat_id)
+        if pending and not pending.done():
+            return
+        task = asyncio.create_task(self._delayed_chat_action(bot, chat_id, action, delay))
+        self._pending_actions[chat_id] = task
+        task.add_done_callback(lambda t: self._chat_action_done(chat_id, t))
+
+    def cancel_chat_action(self, chat_id: int) -> None:
+        """Drop the pending chat action of a chat, if any"""
+        task = self._pending_actions.pop(int(chat_id), None)
+        if task:
+            task.cancel()
+
+    async def _delayed_chat_action(self, bot: Bot, chat_id: int, action: str, delay: float) -> None:
+        await asyncio.sleep(delay)
+        await self.send_chat_action(bot, chat_id, action)
+
+    def _chat_action_done(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._pending_actions.get(chat_id) is task:
+            del self._pending_actions[chat_id]
+        if not task.cancelled() and task.exception():
+            logger.warning("Failed to send chat action: %s", task.exception())
+
+
+class UserMessageLimiter:
+    """
+    Fixed-window counter of incoming messages per user.
+
+    Lets at most `limit` messages of a user reach the orchestrator per window,
+    so one user flooding the bot cannot queue up expensive agent calls.
+    Counters live in process memory and only recently active users are kept.
+    """
+
+    def __init__(self, limit: int, window: float = USER_MESSAGE_WINDOW, capacity: int = CHAT_LIMITER_CACHE_SIZE):
+        self._limit = limit
+        self._window = window
+        self._capacity = capacity
+        # user_id -> (window start, messages counted in it)
+        self._counters: "OrderedDict[int, Tuple[float, int]]" = OrderedDict()
+
+    def hit(self, user_id: int) -> int:
+        """
+        Count a message of a user.
+
+        Returns:
+            0 if the message is allowed, otherwise how many messages over the limit it is
+        """
+        now = time.monotonic()
+        started, count = self._counters.get(user_id, (now, 0))
+        if now - started >= self._window:
+            started, count = now, 0
+        count += 1
+        self._counters[user_id] = (started, count)
+        self._counters.move_to_end(user_id)
+        if len(self._counters) > self._capacity:
+            self._counters.popitem(last=False)
+        return max(0, count - self._limit)
@@ -0,0 +1,51 @@
+import logging
+from typing import Optional
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, the stdlib json module is used instead
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by every Bot API call and file download of a bot
+CONNECTION_LIMIT = 100
+KEEPALIVE_TIMEOUT = 75
+
+
+def _orjson_dumps(value) -> str:
+    # aiogram sends the serialized value as a form field, which expects str
+    return orjson.dumps(value).decode()
+
+
+def create_bot_session(limit: int = CONNECTION_LIMIT) -> AiohttpSession:
+    """
+    Create an aiohttp session with a connection pool sized for bursty traffic.
+
+    All requests to api.telegram.org go to one host, so the per-host limit and
+    keep-alive matter most: they let downloads reuse open TLS connections
+    instead of queueing behind the default pool or re-handshaking.
+
+    Args:
+        limit: Open connections allowed, per host as well since every call goes to one host
+    """
+    json_options = {}
+    if orjson is not None:
+        # Every Bot API response is parsed and every reply markup serialized through these
+        json_options = {"json_loads": orjson.loads, "json_dumps": _orjson_dumps}
+    session = AiohttpSession(limit=limit, **json_options)
+    # aiogram only exposes the total limit, the remaining TCPConnector options go through
+    # its private _connector_init (aiogram 3.x), revisit when upgrading aiogram.
+    # Its DNS cache TTL (3600s) is kept as is.
+    session._connector_init.update(
+        limit_per_host=limit,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+    )
+    return session
+
+
+def create_bot(token: str, session: Optional[AiohttpSession] = None, connection_limit: int = CONNECTION_LIMIT) -> Bot:
+    """Create a Bot backed by the given session, or by a new tuned connection pool of `connection_limit` connections"""
+    return Bot(token=token, session=session if session is not None else create_bot_session(connection_limit))
@@ -1,31 +1,50 @@
 import logging
-from typing import Callable, Optional, Dict, List, Any
-from aiogram import Bot, Dispatcher, types
+from collections import deque
+from typing import Callable, Optional, Dict, List, Any, Deque
+from aiogram import types, F
+from aiogram.enums import ContentType
 from aiogram.filters import Command
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton
-import traceback
-from ..messages import get_message
-from common_utils.logging.bug_catcher import report_error_if_enabled
-from .image_utils import get_image_as_base64, get_image_as_url
+from ..message_types import START_COMMAND, DELETE_ALL_HISTORY, TEXT_MESSAGE, IMAGE_MESSAGE, CONTROL_MESSAGE_TYPES, IncomingMessage
+from .error_reporting import report_error_in_background
+from aiogram.client.session.aiohttp import AiohttpSession
+from .image_utils import get_images_as_urls
+from .base_interface import BaseBotInterface
 
 logger = logging.getLogger(__name__)
 
+# Handler filters, built once per process instead of per interface
+START_FILTER = Command(commands=["start"])
+DELETE_ALL_HISTORY_FILTER = Command(commands=["delete_all_history"])
+# Content the interface cannot pass on is answered before the main message handler runs
+UNSUPPORTED_CONTENT_FILTER = ~F.content_type.in_({ContentType.TEXT, ContentType.PHOTO})
+# Default number of chat messages kept in memory
+DEFAULT_CHAT_HISTORY_MAX = 200
 
-class ShowcaseInterface:
+
+class ShowcaseInterface(BaseBotInterface):
     """Showcase Telegram bot interface - handles only basic functionality with start new chat button"""
+
+    interface_name = "Showcase"
     
-    def __init__(self, token: str, config):
-        """Initialize the Telegram bot interface"""
-        if not token:
-            raise ValueError("TELEGRAM_BOT_TOKEN is required")
-        self.bot = Bot(token=token)
-        self.dp = Dispatcher()
-        self.chat_history = []
-        self.config = config
+    def __init__(self, token: str, config, session: Optional[AiohttpSession] = None):
+        """Initialize the Telegram bot interface
 
-    def get_main_keyboard(self) -> ReplyKeyboardMarkup:
-        """Create a keyboard with only the start new chat button"""
-        keyboard = ReplyKeyboardMarkup(
+        Args:
+            token: Telegram bot token
+            config: Configuration object
+            session: Optional shared session owned by the host process, closed by the host
+        """
+        super().__init__(token, config, session)
+        # Chat history stored as parallel arrays instead of one dict per entry,
+        # only the most recent messages are kept
+        history_max = getattr(getattr(config, 'view', None), 'chat_history_max', DEFAULT_CHAT_HISTORY_MAX)
+        self._history_types: Deque[str] = deque(maxlen=history_max)
+        self._history_messages: Deque[str] = deque(maxlen=history_max)
+        # Nothing in the showcase reads the history (no issue reports), so it is off unless enabled
+        self._track_history = getattr(getattr(config, 'view', None), 'track_history', False)
+        # The keyboard never changes, build it once instead of on every reply
+        self._main_keyboard = ReplyKeyboardMarkup(
             keyboard=[
                 [
                     KeyboardButton(text="🔄 Start New Chat"),
@@ -34,38 +53,33 @@ class ShowcaseInterface:
             resize_keyboard=True,
             is_persistent=True,
         )
-        return keyboard
-
-    async def send_message(self, chat_id: int, message: str) -> None:
-        """Send a message via Telegram bot"""
-        try:
-            logger.debug(f"Sending message to {chat_id}: {message[:50]}...")
-            await self.bot.send_message(chat_id=chat_id, text=message)
-            # Add AI response to chat history
-            self.chat_history.append({"type": "ai", "message": message})
-        except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
-                self.config, 
-                e, 
-                "Error sending message (Showcase Interface)", 
-                {"chat_id": chat_id, "message_length": len(message)}
-            )
-            
-            logger.error(f"[chat_id:{chat_id}] Error sending message: {e}\n{traceback.format_exc()}")
-            raise
 
-    async def _send_error_message(self, message: types.Message, language_code: str):
-        """Send an error message to the user"""
-        error_message = get_message("error", language_code)
-        await message.answer(error_message, reply_markup=self.get_main_keyboard())
-        self.chat_history.append({"type": "ai", "message": error_message})
+    @property
+    def chat_history(self) -> List[Dict[str, str]]:
+        """Chat history in the list-of-dicts shape used by the other interfaces"""
+        return [
+            {"type": message_type, "message": message}
+            for message_type, message in zip(self._history_types, self._history_messages)
+        ]
 
-    async def _send_unsupported_content_message(self, message: types.Message, language_code: str):
-        """Send a message for unsupported content types"""
-        unsupported_message = get_message("unsupported_content", language_code)
-        await message.answer(unsupported_message, reply_markup=self.get_main_keyboard())
-        self.chat_history.append({"type": "ai", "message": unsupported_message})
+    def _record_history(self, chat_id: int, message_type: str, message: str) -> None:
+        """Append a message to the chat history, if history tracking is enabled
+
+        The showcase keeps one history for all chats, it is only tracked on request and never reported.
+        """
+        if not self._track_history:
+            return
+        self._history_types.append(message_type)
+        self._history_messages.append(message)
+
+    def _clear_history(self) -> None:
+        """Remove all messages from the chat history"""
+        self._history_types.clear()
+        self._history_messages.clear()
+
+    def get_main_keyboard(self) -> ReplyKeyboardMarkup:
+        """Return the keyboard with only the start new chat button"""
+        return self._main_keyboard
 
     def setup_handlers(self, handle_message: Callable, config):
         """Setup message handlers for the Telegram bot
@@ -77,93 +91,107 @@ class ShowcaseInterface:
         
         async def process_message(message: types.Message, message_type: str, text: str = None):
             """Unified message processing function"""
-            user_id = message.from_user.id
+            # Bind the sender once, every field below is read from it
+            from_user = message.from_user
+            user_id = from_user.id
             chat_id = message.chat.id
-            username = message.from_user.username
-            first_name = message.from_user.first_name
-            last_name = message.from_user.last_name
-            language_code = message.from_user.language_code or "en"
+            username = from_user.username
+            first_name = from_user.first_name
+            last_name = from_user.last_name
+            language_code = from_user.language_code or "en"
             
             # Create unified message data structure
-            message_data = {
-                "type": message_type,
-                "user_id": user_id,
-                "chat_id": chat_id,
-                "username": username,
-                "first_name": first_name,
-                "last_name": last_name,
-                "full_name": message.from_user.full_name,
-                "language_code": language_code,
-                "text": text,
-                "timestamp": int(message.date.timestamp())
-            }
+            message_data = IncomingMessage(
+                type=message_type,
+                user_id=user_id,
+                chat_id=chat_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                full_name=from_user.full_name,
+                language_code=language_code,
+                text=text,
+                timestamp=int(message.date.timestamp()),
+            )
             
-            logger.info(f"Processing {message_type} from user {username} (ID: {user_id})")
+            logger.info("Processing %s from user %s (ID: %s)", message_type, username, user_id)
             
-            # Call orchestrator callback
-            try:
-                await handle_message(message_data)
-            except Exception as e:
-                # Report error using the centralized bug catcher function
-                report_error_if_enabled(
-                    config, 
-                    e, 
-                    "Error in orchestrator callback (Showcase Interface)", 
-                    {"message_type": message_type, "user_id": message.from_user.id}
-                )
-                
-                logger.error(f"[chat_id:{chat_id}] Error in orchestrator callback: {e}\n{traceback.format_exc()}")
-                if message_type == "text_message":
-                    # Only show error to user for text messages
-                    error_message = get_message("error", language_code)
-                    await message.answer(error_message, reply_markup=self.get_main_keyboard())
+            # Control commands run inline so their handler can pair them with its own replies,
+            # everything else goes to the worker pool so the update handler returns right away
+            if message_type in CONTROL_MESSAGE_TYPES:
+                await self._dispatch(handle_message, message, message_data)
+            else:
+                await self.callback_pool.submit(self._dispatch, handle_message, message, message_data)
         
-        @self.dp.message(Command(commands=["start"]))
+        @self.dp.message(START_FILTER)
         async def start_command(message: types.Message):
             """Handle the /start command"""
-            logging.debug(f"Message: {message}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Message: %r", message)
             # Clear local state before processing
             user_id = message.from_user.id
-            self.chat_history.clear()
+            self._clear_history()
             
-            # Process message through orchestrator
-            await process_message(message, "start_command")
+            # The history reset finishes before the welcome invites the next message,
+            # which would otherwise reach the orchestrator ahead of the reset
+            await process_message(message, START_COMMAND)
             
             # Send welcome message with keyboard
             keyboard = self.get_main_keyboard()
             welcome_msg = config.title
-            await message.answer(welcome_msg, reply_markup=keyboard)
-            self.chat_history.append({"type": "ai", "message": welcome_msg})
+            self._record_history(message.chat.id, "ai", welcome_msg)
+            await self._answer(message, welcome_msg, keyboard)
 
-        @self.dp.message(Command(commands=["delete_all_history"]))
+        @self.dp.message(DELETE_ALL_HISTORY_FILTER)
         async def delete_all_history(message: types.Message):
             """Handle delete all history command"""
             # Process message through orchestrator
-            await process_message(message, "delete_all_history")
+            await process_message(message, DELETE_ALL_HISTORY)
             
             # Clear local chat history after orchestrator processes the request
-            self.chat_history.clear()
+            self._clear_history()
+
+        @self.dp.message(UNSUPPORTED_CONTENT_FILTER)
+        async def handle_unsupported_content(message: types.Message):
+            """Reply to content types that are not forwarded to the orchestrator"""
+            await self._send_unsupported_content_message(message, message.from_user.language_code or "en")
 
         @self.dp.message()
         async def handle_telegram_message(message: types.Message):
             """Handle incoming messages"""
-            logging.debug(f"Telegram Message: {message}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Telegram Message: %r", message)
             
-            user_id = message.from_user.id
-            language_code = message.from_user.language_code or "en"
+            from_user = message.from_user
+            user_id = from_user.id
+            language_code = from_user.language_code or "en"
 
             # Add user message to chat history
-            if message.text:
-                self.chat_history.append({"type": "user", "message": message.text})
-
-            await message.bot.send_chat_action(message.chat.id, "typing")
+            if message.text and self._track_history:
+                self._record_history(message.chat.id, "user", message.text)
 
             try:
-                if message.content_type == "photo":
+                # content_type is always a ContentType member, so an identity check is enough
+                if message.content_type is ContentType.PHOTO:
+                    # Checked before the photos are resolved
+                    if await self._is_rate_limited(message):
+                        return
+                    # Collect albums so all their photos are resolved concurrently
+                    photo_messages = [message]
+                    if message.media_group_id:
+                        photo_messages = await self.media_groups.collect(message)
+                        if not photo_messages:
+                            return
+
+                    # Only messages that reach the orchestrator show "typing"
+                    self.send_queue.start_chat_action(self.bot, message.chat.id)
+
                     # Handle photo messages - get URL instead of base64
-                    image_url = await get_image_as_url(self.bot, message)
-                    if image_url:
-                        caption = message.caption if message.caption else ""
+                    image_urls = await get_images_as_urls(self.bot, photo_messages)
+                    for photo_message, image_url in zip(photo_messages, image_urls):
+                        if not image_url:
+                            continue
+                        caption = photo_message.caption if photo_message.caption else ""
                         
                         # Create combined image data with URL
                         image_data = {
@@ -173,13 +201,10 @@ class ShowcaseInterface:
                         
                         # Add to chat history
                         chat_message = caption if caption else "Image sent"
-                        self.chat_history.append({"type": "user", "message": chat_message})
+                        self._record_history(photo_message.chat.id, "user", chat_message)
                         
                         # Process as an image message
-                        await process_message(message, "image_message", image_data)
-                    return
-                elif message.content_type not in ["text", "photo"]:
-                    await self._send_unsupported_content_message(message, language_code)
+                        await process_message(photo_message, IMAGE_MESSAGE, image_data)
                     return
 
                 # Handle start new chat button
@@ -188,37 +213,19 @@ class ShowcaseInterface:
                     return
 
                 # Handle normal text messages
-                await process_message(message, "text_message", message.text)
+                if await self._is_rate_limited(message):
+                    return
+                self.send_queue.start_chat_action(self.bot, message.chat.id)
+                await process_message(message, TEXT_MESSAGE, message.text)
 
             except Exception as e:
-                # Report error using the centralized bug catcher function
-                report_error_if_enabled(
+                # Report error in the background so the user gets the error reply right away
+                report_error_in_background(
                     config, 
                     e, 
                     "Error handling message (Showcase Interface)", 
-                    {"user_id": message.from_user.id, "content_type": message.content_type}
+                    {"user_id": user_id, "content_type": message.content_type}
                 )
                 
-                logger.error(f"[chat_id:{message.chat.id}] Error handling message: {e}\n{traceback.format_exc()}")
+                logger.error("[chat_id:%s] Error handling message: %s", message.chat.id, e, exc_info=True)
                 await self._send_error_message(message, language_code)
-
-    async def run(self):
-        """Run the telegram bot"""
-        # Fetch bot info and log the bot name
-        bot_info = await self.bot.get_me()
-        logger.info(f"Starting Telegram bot: @{bot_info.username} ({bot_info.first_name})")
-        try:
-            await self.dp.start_polling(self.bot)
-        except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
-                self.config, 
-                e, 
-                "Critical error in telegram bot polling (Showcase Interface)", 
-                {"bot_token_configured": bool(self.bot.token)}
-            )
-            
-            logger.error(f"[chat_id:bot] Error running telegram bot: {e}\n{traceback.format_exc()}")
-            raise
-        finally:
-            await self.bot.session.close() 
\ No newline at end of file
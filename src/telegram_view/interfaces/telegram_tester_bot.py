@@ -1,46 +1,89 @@
+import asyncio
 import logging
 from typing import Callable, Optional, Dict
-from aiogram import Bot, Dispatcher, types, F
+from aiogram import types, F
+from aiogram.enums import ContentType
 from aiogram.filters import Command
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery
-import traceback
-from ..messages import get_message
-from .tester_utils import handle_issue_report
-from common_utils.logging.bug_catcher import report_error_if_enabled
-from common_utils.allowed_models import ALLOWED_MODELS, get_model_by_id
-from .image_utils import get_image_as_url
-from .file_utils import get_file_as_base64, get_audio_as_base64, is_supported_document
+from ..message_types import START_COMMAND, DELETE_ALL_HISTORY, TEXT_MESSAGE, IMAGE_MESSAGE, DOCUMENT_MESSAGE, AUDIO_MESSAGE, CONTROL_MESSAGE_TYPES, IncomingMessage
+from .tester_utils import ChatHistories, flush_issue_rows, handle_issue_report
+from .error_reporting import report_error_in_background
+from common_utils.allowed_models import ALLOWED_MODELS
+from aiogram.client.session.aiohttp import AiohttpSession
+from .image_utils import get_images_as_urls
+from .file_utils import get_file_for_agent, is_supported_document, is_within_download_limit
+from .user_state import create_user_state
+from .base_interface import BaseBotInterface
 
 logger = logging.getLogger(__name__)
 
+# ALLOWED_MODELS is static, index the models and their names by id once
+MODEL_BY_ID: Dict[str, dict] = {model["id"]: model for model in ALLOWED_MODELS}
+MODEL_NAME_BY_ID: Dict[str, str] = {model["id"]: model["name"] for model in ALLOWED_MODELS}
+# Marks a process_message call that has not looked up the user's model yet
+_NOT_LOADED = object()
+# Handler filters, built once per process instead of per interface
+START_FILTER = Command(commands=["start"])
+DELETE_ALL_HISTORY_FILTER = Command(commands=["delete_all_history"])
+# Content the interface cannot pass on is answered before the main message handler runs
+UNSUPPORTED_CONTENT_FILTER = ~F.content_type.in_({ContentType.TEXT, ContentType.PHOTO, ContentType.DOCUMENT, ContentType.VOICE, ContentType.AUDIO})
+SELECT_MODEL_FILTER = F.data.startswith("select_model:")
+# Default number of chat messages kept in memory
+DEFAULT_CHAT_HISTORY_MAX = 200
+# and the total characters they may hold
+DEFAULT_CHAT_HISTORY_MAX_CHARS = 32_000
+# Chats whose history is kept, least recently active chats are dropped first
+DEFAULT_CHAT_HISTORY_CHATS = 1000
 
-class TesterBotInterface:
+
+class TesterBotInterface(BaseBotInterface):
     """Pure Telegram bot interface - handles only Telegram-specific functionality"""
+
+    interface_name = "Tester"
     
-    def __init__(self, token: str, config):
-        """Initialize the Telegram bot interface"""
-        if not token:
-            raise ValueError("TELEGRAM_BOT_TOKEN is required")
-        self.bot = Bot(token=token)
-        self.dp = Dispatcher()
-        self.chat_history = []
-        self.reporting_users: set[int] = set()
-        self.config = config
-        # Per-user model preferences storage
-        self.user_model_preferences: Dict[int, str] = {}
+    def __init__(self, token: str, config, session: Optional[AiohttpSession] = None):
+        """Initialize the Telegram bot interface
+
+        Args:
+            token: Telegram bot token
+            config: Configuration object
+            session: Optional shared session owned by the host process, closed by the host
+        """
+        super().__init__(token, config, session)
+        # Only the most recent messages of recently active chats are kept for issue reports
+        history_max = getattr(getattr(config, 'view', None), 'chat_history_max', DEFAULT_CHAT_HISTORY_MAX)
+        history_max_chars = getattr(getattr(config, 'view', None), 'chat_history_max_chars', DEFAULT_CHAT_HISTORY_MAX_CHARS)
+        history_chats = getattr(getattr(config, 'view', None), 'chat_history_chats', DEFAULT_CHAT_HISTORY_CHATS)
+        self.chat_history = ChatHistories(maxlen=history_max, max_chars=history_max_chars, max_chats=history_chats)
+        # Per-user model preferences and issue reporting flags, in Redis when view.redis_url is set
+        self.user_state = create_user_state(config, token)
         # Check if model selector should be shown (from view config)
         self.show_model_selector = getattr(getattr(config, 'view', None), 'show_model_selector', False)
+        # Model info used when the user has not selected a model
+        self._default_model_info = self._build_default_model_info()
+        # Keyboards only depend on config and ALLOWED_MODELS, build them once instead of on every reply
+        self._main_keyboard = self._build_main_keyboard()
+        self._model_selection_keyboard = self._build_model_selection_keyboard()
+        # How documents/audio reach the agent: 'base64' embeds content, 'url' prefers S3/Telegram URLs
+        self.file_delivery = getattr(getattr(config, 'view', None), 'file_delivery', 'base64')
+        # Handlers for media content types, looked up once per update
+        self._content_handlers = {
+            ContentType.PHOTO: self._handle_photo,
+            ContentType.DOCUMENT: self._handle_document,
+            ContentType.VOICE: self._handle_audio,
+            ContentType.AUDIO: self._handle_audio,
+        }
 
-    def get_user_model(self, user_id: int) -> Optional[str]:
+    async def get_user_model(self, user_id: int) -> Optional[str]:
         """Get the selected model for a user, or None for default"""
-        return self.user_model_preferences.get(user_id)
+        return await self.user_state.get_model(user_id)
 
-    def set_user_model(self, user_id: int, model_id: str) -> None:
+    async def set_user_model(self, user_id: int, model_id: str) -> None:
         """Set the selected model for a user"""
-        self.user_model_preferences[user_id] = model_id
-        logger.info(f"User {user_id} selected model: {model_id}")
+        await self.user_state.set_model(user_id, model_id)
+        logger.info("User %s selected model: %s", user_id, model_id)
 
-    def get_main_keyboard(self) -> ReplyKeyboardMarkup:
+    def _build_main_keyboard(self) -> ReplyKeyboardMarkup:
         """Create a keyboard with the main action buttons"""
         buttons = [
             [
@@ -55,63 +98,43 @@ class TesterBotInterface:
         keyboard = ReplyKeyboardMarkup(keyboard=buttons, resize_keyboard=True, is_persistent=True)
         return keyboard
 
-    def get_model_selection_keyboard(self) -> InlineKeyboardMarkup:
+    def _build_model_selection_keyboard(self) -> InlineKeyboardMarkup:
         """Create an inline keyboard with available models"""
         buttons = []
         for model in ALLOWED_MODELS:
             buttons.append([InlineKeyboardButton(text=model["name"], callback_data=f"select_model:{model['id']}")])
         return InlineKeyboardMarkup(inline_keyboard=buttons)
 
-    async def send_message(self, chat_id: int, message: str) -> None:
-        """Send a message via Telegram bot"""
-        try:
-            logger.debug(f"Sending message to {chat_id}: {message[:50]}...")
-            await self.bot.send_message(chat_id=chat_id, text=message)
-            # Add AI response to chat history for issue reporting
-            self.chat_history.append({"type": "ai", "message": message})
-        except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
-                self.config, 
-                e, 
-                "Error sending message (Tester Interface)", 
-                {"chat_id": chat_id, "message_length": len(message)}
-            )
-            
-            logger.error(f"[chat_id:{chat_id}] Error sending message: {e}\n{traceback.format_exc()}")
-            raise
+    def get_main_keyboard(self) -> ReplyKeyboardMarkup:
+        """Return the keyboard with the main action buttons"""
+        return self._main_keyboard
 
-    async def _send_error_message(self, message: types.Message, language_code: str):
-        """Send an error message to the user"""
-        error_message = get_message("error", language_code)
-        await message.answer(error_message, reply_markup=self.get_main_keyboard())
-        self.chat_history.append({"type": "ai", "message": error_message})
+    def get_model_selection_keyboard(self) -> InlineKeyboardMarkup:
+        """Return the inline keyboard with available models"""
+        return self._model_selection_keyboard
 
-    async def _send_unsupported_content_message(self, message: types.Message, language_code: str):
-        """Send a message for unsupported content types"""
-        unsupported_message = get_message("unsupported_content", language_code)
-        await message.answer(unsupported_message, reply_markup=self.get_main_keyboard())
-        self.chat_history.append({"type": "ai", "message": unsupported_message})
+    def _record_history(self, chat_id: int, message_type: str, message: str) -> None:
+        """Append a message to the chat's history used by issue reports"""
+        self.chat_history.append(chat_id, {"type": message_type, "message": message})
+
+    async def _flush_pending(self) -> None:
+        """Write issue reports still queued for Google Sheets"""
+        await flush_issue_rows()
+
+    async def _reply(self, message: types.Message, text: str, reply_markup=None) -> None:
+        """Reply with the main keyboard (unless another markup is given) and record the reply"""
+        await self._answer(message, text, reply_markup or self._main_keyboard)
+        self._record_history(message.chat.id, "ai", text)
 
     async def _handle_report_issue(self, message: types.Message):
         """Handle the report issue command"""
         user_id = message.from_user.id
-        self.reporting_users.add(user_id)
+        await self.user_state.start_reporting(user_id)
         prompt = "Please describe the issue: "
-        await message.answer(prompt, reply_markup=self.get_main_keyboard())
-        self.chat_history.append({"type": "ai", "message": prompt})
+        await self._reply(message, prompt)
 
-    def _get_current_model_info(self, user_id: int) -> dict:
-        """Get the model info for the current session - either user-selected or config default."""
-        selected_model_id = self.get_user_model(user_id)
-        
-        if selected_model_id:
-            # User explicitly selected a model
-            model_info = get_model_by_id(selected_model_id)
-            if model_info:
-                return {**model_info, "source": "user_selected"}
-        
-        # Fall back to config default
+    def _build_default_model_info(self) -> dict:
+        """Describe the config default model, which does not change at runtime"""
         llm_config = getattr(self.config, 'llm', None)
         if llm_config and hasattr(llm_config, 'large'):
             large_config = llm_config.large
@@ -124,34 +147,134 @@ class TesterBotInterface:
         
         return {"source": "unknown"}
 
-    async def _handle_issue_submission(self, message: types.Message):
-        """Handle issue report submission"""
+    async def _get_current_model_info(self, user_id: int) -> dict:
+        """Get the model info for the current session - either user-selected or config default."""
+        return self._model_info(await self.get_user_model(user_id))
+
+    def _model_info(self, selected_model_id: Optional[str]) -> dict:
+        """Model info for a selected model id, or the config default when there is none"""
+        if selected_model_id:
+            # User explicitly selected a model
+            model_info = MODEL_BY_ID.get(selected_model_id)
+            if model_info:
+                return {**model_info, "source": "user_selected"}
+        
+        # Fall back to config default
+        return self._default_model_info
+
+    async def _handle_issue_submission(self, message: types.Message, selected_model_id: Optional[str]):
+        """Handle issue report submission, with the user's model already looked up by the caller"""
         user_id = message.from_user.id
-        self.reporting_users.remove(user_id)
+        await self.user_state.stop_reporting(user_id)
         
         # Get model info (either user-selected or config default)
-        model_info = self._get_current_model_info(user_id)
+        model_info = self._model_info(selected_model_id)
         
-        await handle_issue_report(user_id, message.text, self.chat_history, self.config, model_info)
+        await handle_issue_report(user_id, message.text, self.chat_history.get(message.chat.id), self.config, model_info)
         confirmation = "Thank you for reporting the issue, starting new chat..."
-        await message.answer(confirmation, reply_markup=self.get_main_keyboard())
-        self.chat_history.append({"type": "ai", "message": confirmation})
+        await self._reply(message, confirmation)
         # Need to call start_command - we'll handle this in setup_handlers
 
     async def _handle_model_selection(self, message: types.Message):
         """Handle the model selection command - show inline keyboard with models"""
         user_id = message.from_user.id
-        current_model = self.get_user_model(user_id)
-        current_model_name = "Default"
-        if current_model:
-            for model in ALLOWED_MODELS:
-                if model["id"] == current_model:
-                    current_model_name = model["name"]
-                    break
+        current_model = await self.get_user_model(user_id)
+        current_model_name = MODEL_NAME_BY_ID.get(current_model, "Default")
         
         prompt = f"Current model: {current_model_name}\n\nSelect a model:"
-        await message.answer(prompt, reply_markup=self.get_model_selection_keyboard())
-        self.chat_history.append({"type": "ai", "message": prompt})
+        await self._reply(message, prompt, self.get_model_selection_keyboard())
+
+    async def _handle_photo(self, message: types.Message, process_message: Callable):
+        """Resolve photos (whole albums at once) to URLs and pass them to the orchestrator"""
+        # Collect albums so all their photos are resolved concurrently
+        photo_messages = [message]
+        if message.media_group_id:
+            photo_messages = await self.media_groups.collect(message)
+            if not photo_messages:
+                return
+
+        # Only messages that reach the orchestrator show "typing"
+        self.send_queue.start_chat_action(self.bot, message.chat.id)
+
+        # Handle photo messages - get URL instead of base64
+        image_urls = await get_images_as_urls(self.bot, photo_messages)
+        for photo_message, image_url in zip(photo_messages, image_urls):
+            if not image_url:
+                continue
+            caption = photo_message.caption if photo_message.caption else ""
+            
+            # Create combined image data with URL
+            image_data = {
+                "image": image_url,
+                "caption": caption
+            }
+            
+            # Add to chat history
+            chat_message = caption if caption else "Image sent"
+            self._record_history(photo_message.chat.id, "user", chat_message)
+            
+            # Process as an image message
+            await process_message(photo_message, IMAGE_MESSAGE, image_data)
+
+    async def _handle_document(self, message: types.Message, process_message: Callable):
+        """Prepare a supported document (PDF, DOC, TXT) and pass it to the orchestrator"""
+        if not is_supported_document(message) or not is_within_download_limit(message):
+            await self._send_unsupported_content_message(message, message.from_user.language_code or "en")
+            return
+        
+        self.send_queue.start_chat_action(self.bot, message.chat.id)
+        caption = message.caption if message.caption else ""
+        file_name = message.document.file_name if message.document else "document"
+        
+        # Base64 embeds file content for persistence across turns, URLs skip the download
+        logger.debug("Processing document: %s", file_name)
+        file_result = await get_file_for_agent(self.bot, message, str(message.chat.id), self.file_delivery)
+        
+        if file_result:
+            file_data, mime_type, source = file_result
+            logger.info("Document prepared via %s: %s (%s, %s chars)", source, file_name, mime_type, len(file_data))
+            document_data = {
+                "file": file_data,
+                "mime_type": mime_type,
+                "file_name": file_name,
+                "caption": caption
+            }
+            
+            chat_message = caption if caption else f"Document sent: {file_name}"
+            self._record_history(message.chat.id, "user", chat_message)
+            
+            await process_message(message, DOCUMENT_MESSAGE, document_data)
+        else:
+            logger.error("[chat_id:%s] Failed to prepare document: %s", message.chat.id, file_name)
+
+    async def _handle_audio(self, message: types.Message, process_message: Callable):
+        """Prepare a voice/audio message and pass it to the orchestrator"""
+        if not is_within_download_limit(message):
+            await self._send_unsupported_content_message(message, message.from_user.language_code or "en")
+            return
+
+        self.send_queue.start_chat_action(self.bot, message.chat.id)
+        caption = message.caption if message.caption else ""
+        
+        # Base64 embeds audio content for persistence across turns, URLs skip the download
+        logger.debug("Processing audio message (type: %s)", message.content_type)
+        audio_result = await get_file_for_agent(self.bot, message, str(message.chat.id), self.file_delivery)
+        
+        if audio_result:
+            audio_data, mime_type, source = audio_result
+            logger.info("Audio prepared via %s: %s (%s chars)", source, mime_type, len(audio_data))
+            audio_msg_data = {
+                "audio": audio_data,
+                "mime_type": mime_type,
+                "caption": caption
+            }
+            
+            chat_message = caption if caption else "Audio message sent"
+            self._record_history(message.chat.id, "user", chat_message)
+            
+            await process_message(message, AUDIO_MESSAGE, audio_msg_data)
+        else:
+            logger.error("[chat_id:%s] Failed to prepare audio", message.chat.id)
 
     def setup_handlers(self, handle_message: Callable, config):
         """Setup message handlers for the Telegram bot
@@ -161,71 +284,53 @@ class TesterBotInterface:
             config: Configuration object with title and other settings
         """
         
-        async def process_message(message: types.Message, message_type: str, text: str = None):
+        async def process_message(message: types.Message, message_type: str, text: str = None, selected_model=_NOT_LOADED):
             """Unified message processing function"""
-            user_id = message.from_user.id
+            # Bind the sender once, every field below is read from it
+            from_user = message.from_user
+            user_id = from_user.id
             chat_id = message.chat.id
-            username = message.from_user.username
-            first_name = message.from_user.first_name
-            last_name = message.from_user.last_name
-            language_code = message.from_user.language_code or "en"
+            username = from_user.username
+            first_name = from_user.first_name
+            last_name = from_user.last_name
+            language_code = from_user.language_code or "en"
             
-            # Get user's selected model (if any)
-            selected_model = self.get_user_model(user_id)
+            # Get user's selected model (if any), unless the caller already looked it up
+            if selected_model is _NOT_LOADED:
+                selected_model = await self.get_user_model(user_id)
             
             # Create unified message data structure
-            message_data = {
-                "type": message_type,
-                "user_id": user_id,
-                "chat_id": chat_id,
-                "username": username,
-                "first_name": first_name,
-                "last_name": last_name,
-                "full_name": message.from_user.full_name,
-                "language_code": language_code,
-                "text": text,
-                "timestamp": int(message.date.timestamp()),
-                "settings": {"model": selected_model} if selected_model else {}
-            }
+            message_data = IncomingMessage(
+                type=message_type,
+                user_id=user_id,
+                chat_id=chat_id,
+                username=username,
+                first_name=first_name,
+                last_name=last_name,
+                full_name=from_user.full_name,
+                language_code=language_code,
+                text=text,
+                timestamp=int(message.date.timestamp()),
+                settings={"model": selected_model} if selected_model else {},
+            )
             
-            logger.info(f"Processing {message_type} from user {username} (ID: {user_id})")
+            logger.info("Processing %s from user %s (ID: %s)", message_type, username, user_id)
             
-            # Call orchestrator callback and DO NOT return response
-            try:
-                await handle_message(message_data)
-                # response = await orchestrator_callback(message_data)
-                # if response:
-                #     await self.send_message(user_id, response)
-                #     self.chat_history.append({"type": "ai", "message": response})
-                # return response
-            except Exception as e:
-                # Report error using the centralized bug catcher function
-                report_error_if_enabled(
-                    config, 
-                    e, 
-                    "Error in orchestrator callback (Tester Interface)", 
-                    {"message_type": message_type, "user_id": message.from_user.id}
-                )
-                
-                logger.error(f"[chat_id:{chat_id}] Error in orchestrator callback: {e}\n{traceback.format_exc()}")
-                if message_type == "text_message":
-                    # Only show error to user for text messages
-                    error_message = get_message("error", language_code)
-                    await message.answer(error_message, reply_markup=self.get_main_keyboard())
-                    # self.chat_history.append({"type": "ai", "message": error_message})
-                # return None
+            # Control commands run inline so their handler can pair them with its own replies,
+            # everything else goes to the worker pool so the update handler returns right away
+            if message_type in CONTROL_MESSAGE_TYPES:
+                await self._dispatch(handle_message, message, message_data)
+            else:
+                await self.callback_pool.submit(self._dispatch, handle_message, message, message_data)
         
-        @self.dp.message(Command(commands=["start"]))
+        @self.dp.message(START_FILTER)
         async def start_command(message: types.Message):
             """Handle the /start command"""
             # logging.debug(f"Message: {message}")
             # Clear local state before processing
             user_id = message.from_user.id
-            self.chat_history.clear()
-            self.reporting_users.discard(user_id)
-            
-            # Process message through orchestrator
-            await process_message(message, "start_command")
+            self.chat_history.clear(message.chat.id)
+            await self.user_state.stop_reporting(user_id)
             
             # Send welcome message with keyboard
             keyboard = self.get_main_keyboard()
@@ -233,193 +338,120 @@ class TesterBotInterface:
             
             # Add model info if model selector is enabled
             if self.show_model_selector:
-                model_info = self._get_current_model_info(user_id)
+                model_info = await self._get_current_model_info(user_id)
                 model_name = model_info.get("name") or model_info.get("id", "Unknown")
                 welcome_msg += f"\n🤖 Model: {model_name}"
             
-            await message.answer(welcome_msg, reply_markup=keyboard)
-            self.chat_history.append({"type": "ai", "message": welcome_msg})
+            # The history reset finishes before the welcome invites the next message,
+            # which would otherwise reach the orchestrator ahead of the reset
+            await process_message(message, START_COMMAND)
+            await self._reply(message, welcome_msg, keyboard)
 
-        @self.dp.message(Command(commands=["delete_all_history"]))
+        @self.dp.message(DELETE_ALL_HISTORY_FILTER)
         async def delete_all_history(message: types.Message):
             """Handle delete all history command"""
             # Process message through orchestrator
-            await process_message(message, "delete_all_history")
+            await process_message(message, DELETE_ALL_HISTORY)
             
             # Clear local chat history after orchestrator processes the request
-            self.chat_history.clear()
+            self.chat_history.clear(message.chat.id)
 
-        @self.dp.callback_query(F.data.startswith("select_model:"))
+        @self.dp.callback_query(SELECT_MODEL_FILTER)
         async def handle_model_selection_callback(callback: CallbackQuery):
             """Handle model selection from inline keyboard"""
             user_id = callback.from_user.id
-            model_id = callback.data.split(":")[1]
+            _, _, model_id = callback.data.partition(":")
             
-            # Find model name for confirmation message
-            model_name = model_id
-            for model in ALLOWED_MODELS:
-                if model["id"] == model_id:
-                    model_name = model["name"]
-                    break
+            # Callback data comes from the client, only models offered by the keyboard are accepted
+            model_name = MODEL_NAME_BY_ID.get(model_id)
+            if model_name is None:
+                logger.warning("User %s selected unknown model: %s", user_id, model_id)
+                await callback.answer("Unknown model")
+                return
             
             # Store user's model preference
-            self.set_user_model(user_id, model_id)
+            await self.set_user_model(user_id, model_id)
             
-            # Acknowledge the callback and update message
-            await callback.answer(f"Selected: {model_name}")
-            await callback.message.edit_text(f"✅ Model changed to: {model_name}\n\nYour next messages will use this model.")
+            # Acknowledge the callback and update message, the two calls are independent
+            await asyncio.gather(
+                callback.answer(f"Selected: {model_name}"),
+                self.send_queue.enqueue(
+                    lambda: callback.message.edit_text(f"✅ Model changed to: {model_name}\n\nYour next messages will use this model.")
+                ),
+            )
+
+        # Command pattern for special button commands, built once for all messages
+        command_handlers = {
+            "🔄 Start New Chat": start_command,
+            "⚠️ Report Issue": self._handle_report_issue
+        }
+        # Handle model selection button only if enabled in config
+        if self.show_model_selector:
+            command_handlers["🤖 Select Model"] = self._handle_model_selection
+        # Every button starts with an emoji, plain chat text is rejected on its first character
+        command_prefixes = frozenset(command[0] for command in command_handlers)
+
+        @self.dp.message(UNSUPPORTED_CONTENT_FILTER)
+        async def handle_unsupported_content(message: types.Message):
+            """Reply to content types that are not forwarded to the orchestrator"""
+            await self._send_unsupported_content_message(message, message.from_user.language_code or "en")
 
         @self.dp.message()
         async def handle_telegram_message(message: types.Message):
             """Handle incoming messages"""
             # logging.debug(f"Telegram Message: {message}")
 
-            user_id = message.from_user.id
-            language_code = message.from_user.language_code or "en"
+            from_user = message.from_user
+            user_id = from_user.id
+            language_code = from_user.language_code or "en"
 
             # Add user message to chat history
             if message.text:
-                self.chat_history.append({"type": "user", "message": message.text})
-
-            await message.bot.send_chat_action(message.chat.id, "typing")
+                self._record_history(message.chat.id, "user", message.text)
 
             try:
-                if message.content_type == "photo":
-                    # Handle photo messages - get URL instead of base64
-                    image_url = await get_image_as_url(self.bot, message)
-                    if image_url:
-                        caption = message.caption if message.caption else ""
-                        
-                        # Create combined image data with URL
-                        image_data = {
-                            "image": image_url,
-                            "caption": caption
-                        }
-                        
-                        # Add to chat history
-                        chat_message = caption if caption else "Image sent"
-                        self.chat_history.append({"type": "user", "message": chat_message})
-                        
-                        # Process as an image message
-                        await process_message(message, "image_message", image_data)
-                    return
-                
-                elif message.content_type == "document":
-                    # Handle document messages (PDF, DOC, TXT)
-                    if not is_supported_document(message):
-                        await self._send_unsupported_content_message(message, language_code)
-                        return
-                    
-                    caption = message.caption if message.caption else ""
-                    file_name = message.document.file_name if message.document else "document"
-                    
-                    # Use base64 to embed file content for persistence across turns
-                    logger.debug(f"Processing document: {file_name}")
-                    file_result = await get_file_as_base64(self.bot, message)
-                    
-                    if file_result:
-                        file_data, mime_type = file_result
-                        logger.info(f"Document encoded to base64: {file_name} ({mime_type}, {len(file_data)} chars)")
-                        document_data = {
-                            "file": file_data,
-                            "mime_type": mime_type,
-                            "file_name": file_name,
-                            "caption": caption
-                        }
-                        
-                        chat_message = caption if caption else f"Document sent: {file_name}"
-                        self.chat_history.append({"type": "user", "message": chat_message})
-                        
-                        await process_message(message, "document_message", document_data)
-                    else:
-                        logger.error(f"[chat_id:{message.chat.id}] Failed to encode document to base64: {file_name}")
-                    return
-                
-                elif message.content_type in ["voice", "audio"]:
-                    # Handle voice/audio messages
-                    caption = message.caption if message.caption else ""
-                    
-                    # Use base64 to embed audio content for persistence across turns
-                    logger.debug(f"Processing audio message (type: {message.content_type})")
-                    audio_result = await get_audio_as_base64(self.bot, message)
-                    
-                    if audio_result:
-                        audio_data, mime_type = audio_result
-                        logger.info(f"Audio encoded to base64: {mime_type} ({len(audio_data)} chars)")
-                        audio_msg_data = {
-                            "audio": audio_data,
-                            "mime_type": mime_type,
-                            "caption": caption
-                        }
-                        
-                        chat_message = caption if caption else "Audio message sent"
-                        self.chat_history.append({"type": "user", "message": chat_message})
-                        
-                        await process_message(message, "audio_message", audio_msg_data)
-                    else:
-                        logger.error(f"[chat_id:{message.chat.id}] Failed to encode audio to base64")
+                # Media content goes to its handler, unsupported content never gets here
+                content_handler = self._content_handlers.get(message.content_type)
+                if content_handler:
+                    # Checked before the media is downloaded or resolved
+                    if not await self._is_rate_limited(message):
+                        await content_handler(message, process_message)
                     return
-                
-                elif message.content_type not in ["text", "photo", "document", "voice", "audio"]:
-                    await self._send_unsupported_content_message(message, language_code)
-                    return
-
-                # Handle model selection button
-                if message.text == "🤖 Select Model" and self.show_model_selector:
-                    await self._handle_model_selection(message)
-                    return
-
-                # Command pattern for special button commands
-                command_handlers = {
-                    "🔄 Start New Chat": start_command,
-                    "⚠️ Report Issue": self._handle_report_issue
-                }
 
-                # Execute command if it exists
-                command_handler = command_handlers.get(message.text)
-                if command_handler:
-                    await command_handler(message)
-                    return
+                # Execute button command if it exists
+                if message.text and message.text[0] in command_prefixes:
+                    command_handler = command_handlers.get(message.text)
+                    if command_handler:
+                        await command_handler(message)
+                        return
 
                 # Handle issue report submission
-                if user_id in self.reporting_users:
-                    await self._handle_issue_submission(message)
+                selected_model, reporting = await self.user_state.get_model_and_reporting(user_id)
+                if reporting:
+                    await self._handle_issue_submission(message, selected_model)
                     # After handling issue submission, call start_command
                     await start_command(message)
                     return
 
                 # Handle normal text messages
-                await process_message(message, "text_message", message.text)
+                if await self._is_rate_limited(message):
+                    return
+                self.send_queue.start_chat_action(self.bot, message.chat.id)
+                await process_message(message, TEXT_MESSAGE, message.text, selected_model)
 
             except Exception as e:
-                # Report error using the centralized bug catcher function
-                report_error_if_enabled(
+                # Report error in the background so the user gets the error reply right away
+                report_error_in_background(
                     config, 
                     e, 
                     "Error handling message (Tester Interface)", 
-                    {"user_id": message.from_user.id, "content_type": message.content_type}
+                    {"user_id": user_id, "content_type": message.content_type}
                 )
                 
-                logger.error(f"[chat_id:{message.chat.id}] Error handling message: {e}\n{traceback.format_exc()}")
+                logger.error("[chat_id:%s] Error handling message: %s", message.chat.id, e, exc_info=True)
                 await self._send_error_message(message, language_code)
 
-    async def run(self):
-        """Run the telegram bot"""
-        # Fetch bot info and log the bot name
-        bot_info = await self.bot.get_me()
-        logger.info(f"Starting Telegram bot: @{bot_info.username} ({bot_info.first_name})")
-        try:
-            await self.dp.start_polling(self.bot)
-        except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
-                self.config, 
-                e, 
-                "Critical error in telegram bot polling (Tester Interface)", 
-                {"bot_token_configured": bool(self.bot.token)}
-            )
-            
-            logger.error(f"[chat_id:bot] Error running telegram bot: {e}\n{traceback.format_exc()}")
-            raise
-        finally:
-            await self.bot.session.close() 
\ No newline at end of file
+    async def aclose(self):
+        """Close the bot's HTTP session and the user state store"""
+        await super().aclose()
+        await self.user_state.aclose()
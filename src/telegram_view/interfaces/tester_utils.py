@@ -1,5 +1,8 @@
+import asyncio
 import logging
-from typing import List, Dict, Any
+import time
+from collections import OrderedDict, deque
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from datetime import datetime
 import os
 import gspread
@@ -7,9 +10,102 @@ from oauth2client.service_account import ServiceAccountCredentials
 
 logger = logging.getLogger(__name__)
 
+# Google access tokens live about an hour, rebuild the authorized worksheet a bit earlier
+SHEETS_TABLE_TTL = 50 * 60
+
+# Google Sheets rejects cells longer than 50,000 characters
+SHEETS_CELL_MAX_CHARS = 50_000
+
+_sheets_table_cache: Dict[Tuple[str, str, str], Tuple[Any, float]] = {}
+
+# Rows queued while a Sheets write is in flight are appended together, up to ISSUE_BATCH_SIZE per call
+ISSUE_BATCH_SIZE = 50
+# On shutdown, queued rows get this long to be written before the writer is cancelled
+ISSUE_FLUSH_TIMEOUT = 10.0
+
+_issue_rows: Optional[asyncio.Queue] = None
+_issue_writer: Optional[asyncio.Task] = None
+
+
+class ChatHistory(deque):
+    """
+    Chat history capped by message count and by total characters.
+
+    A single long paste would otherwise dominate what is kept (and reported),
+    so the oldest messages are evicted once the text exceeds max_chars. The
+    two newest messages are always kept. Entries are dicts with type and message.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None, max_chars: Optional[int] = None):
+        super().__init__(maxlen=maxlen)
+        self.max_chars = max_chars
+        self._chars = 0
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        if self.maxlen is not None and len(self) == self.maxlen:
+            # deque drops the oldest entry itself, keep the character count in step
+            self._chars -= len(self[0].get("message", ""))
+        super().append(entry)
+        self._chars += len(entry.get("message", ""))
+        if self.max_chars is not None:
+            while self._chars > self.max_chars and len(self) > 2:
+                self._chars -= len(self.popleft().get("message", ""))
+
+    def clear(self) -> None:
+        super().clear()
+        self._chars = 0
+
+
+class ChatHistories:
+    """
+    A ChatHistory per chat, so an issue report only contains the reporter's chat.
+
+    Only the `max_chats` most recently active chats are kept, the least
+    recently used history is dropped first.
+    """
+
+    def __init__(self, maxlen: Optional[int] = None, max_chars: Optional[int] = None, max_chats: int = 1000):
+        self.maxlen = maxlen
+        self.max_chars = max_chars
+        self.max_chats = max_chats
+        self._histories: "OrderedDict[int, ChatHistory]" = OrderedDict()
+
+    def get(self, chat_id: int) -> ChatHistory:
+        """Get the history of a chat, creating an empty one if there is none"""
+        # The orchestrator passes chat ids as strings, handlers as ints
+        chat_id = int(chat_id)
+        history = self._histories.get(chat_id)
+        if history is None:
+            history = self._histories[chat_id] = ChatHistory(self.maxlen, self.max_chars)
+            if len(self._histories) > self.max_chats:
+                self._histories.popitem(last=False)
+        else:
+            self._histories.move_to_end(chat_id)
+        return history
+
+    def append(self, chat_id: int, entry: Dict[str, Any]) -> None:
+        self.get(chat_id).append(entry)
+
+    def clear(self, chat_id: int) -> None:
+        """Drop the history of a chat"""
+        self._histories.pop(int(chat_id), None)
+
 
 def get_sheets_table(config):
-    """Initialize and return Google Sheets table for issues."""
+    """Return the Google Sheets table for issues, reusing a recently authorized one."""
+    cache_key = (config.sheets.path_to_json_file, config.sheets.data_sheet_name, config.sheets.issues_table)
+    cached = _sheets_table_cache.get(cache_key)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    table = _open_sheets_table(config)
+    if table:
+        _sheets_table_cache[cache_key] = (table, time.monotonic() + SHEETS_TABLE_TTL)
+    return table
+
+
+def _open_sheets_table(config) -> Optional[Any]:
+    """Authorize with the service account and open the issues table."""
     try:
         # Get credentials from config
         credentials_path = config.sheets.path_to_json_file
@@ -28,18 +124,32 @@ def get_sheets_table(config):
         table = client.open(config.sheets.data_sheet_name).worksheet(config.sheets.issues_table)
         return table
     except Exception as e:
-        logger.error(f"Failed to initialize Google Sheets table: {e}")
+        logger.error("Failed to initialize Google Sheets table: %s", e)
         return None
 
 
-def format_chat_history(chat_history: List[Dict[str, Any]]) -> str:
-    """Format chat history into a readable string."""
-    formatted_messages = []
-    for msg in chat_history:
-        role = "User" if msg.get("type") == "user" else "AI"
-        content = msg.get("message", "")
-        formatted_messages.append(f"{role}: {content}")
-    return "\n".join(formatted_messages)
+def format_chat_history(chat_history: Sequence[Dict[str, Any]], max_chars: Optional[int] = None) -> str:
+    """Format chat history into a readable string.
+
+    When max_chars is given, only the most recent messages that fit are formatted,
+    walking the history from the end so older messages are never touched.
+    """
+    if max_chars is None:
+        return "\n".join(
+            f"{'User' if msg.get('type') == 'user' else 'AI'}: {msg.get('message', '')}"
+            for msg in chat_history
+        )
+
+    lines = []
+    total = 0
+    for msg in reversed(chat_history):
+        line = f"{'User' if msg.get('type') == 'user' else 'AI'}: {msg.get('message', '')}"
+        total += len(line) + 1
+        if total > max_chars + 1:
+            break
+        lines.append(line)
+    lines.reverse()
+    return "\n".join(lines)
 
 
 def format_model_info(model_info: Dict[str, Any]) -> str:
@@ -47,30 +157,28 @@ def format_model_info(model_info: Dict[str, Any]) -> str:
     if not model_info:
         return "Default (no model selected)"
     
-    lines = []
-    for key, value in model_info.items():
-        if isinstance(value, dict):
-            lines.append(f"{key}: {value}")
-        else:
-            lines.append(f"{key}: {value}")
-    return "\n".join(lines)
+    # Nested dicts and plain values are formatted the same way
+    return "\n".join([f"{key}: {value}" for key, value in model_info.items()])
 
 
 async def handle_issue_report(
-    chat_id: int, issue_details: str, chat_history: List[Dict[str, Any]], config, model_info: Dict[str, Any] = None
+    chat_id: int, issue_details: str, chat_history: Sequence[Dict[str, Any]], config, model_info: Dict[str, Any] = None
 ) -> None:
     """
-    Handle issue reports by logging them and appending to Google Sheets.
+    Handle issue reports by logging them and queueing them for Google Sheets.
 
     Args:
         chat_id: The ID of the chat where the issue was reported
         issue_details: The details of the reported issue
-        chat_history: List of chat messages in the conversation, each with type and message fields
+        chat_history: Chat messages in the conversation (list or bounded deque), each with type and message fields
         config: Configuration object
         model_info: Dictionary containing model configuration used during the session
     """
+    # The history is bounded by the interface, format it once for the log and the sheet
+    chat_history_str = format_chat_history(chat_history, SHEETS_CELL_MAX_CHARS)
+
     # Log the issue report
-    logger.info(f"Received issue report from chat {chat_id}")
+    logger.info("Received issue report from chat %s", chat_id)
     logger.info("Issue details:")
     logger.info("-" * 50)
     logger.info(issue_details)
@@ -78,33 +186,80 @@ async def handle_issue_report(
     logger.info("Model info:")
     logger.info(model_info if model_info else "Default")
     logger.info("-" * 50)
-    logger.info("Chat history:")
-    for msg in chat_history:
-        logger.info(f"[{msg.get('type', 'unknown')}]: {msg.get('message', '')}")
+    logger.info("Chat history:\n%s", chat_history_str)
     logger.info("-" * 50)
 
-    # Append to Google Sheets
-    try:
-        table = get_sheets_table(config)
-        if not table:
-            logger.error("Could not initialize Google Sheets table")
-            return
-
-        # Format chat history into a string
-        chat_history_str = format_chat_history(chat_history)
-        model_info_str = format_model_info(model_info)
-
-        # Prepare the row data
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        row_data = [
-            current_time,  # Date
-            model_info_str,  # Model Info
-            chat_history_str,  # Thread (formatted chat history)
-            issue_details,  # Description
-        ]
+    model_info_str = format_model_info(model_info)
 
-        # Append the row to the sheet
-        table.append_row(row_data)
-        logger.info("Successfully appended issue report to Google Sheets")
-    except Exception as e:
-        logger.error(f"Failed to append issue report to Google Sheets: {e}")
+    # Prepare the row data
+    current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    row_data = [
+        current_time,  # Date
+        model_info_str,  # Model Info
+        chat_history_str,  # Thread (formatted chat history)
+        issue_details,  # Description
+    ]
+
+    # Rows are written to Google Sheets in batches by a background task
+    _enqueue_issue_row(config, row_data)
+
+
+def _enqueue_issue_row(config, row_data: List[Any]) -> None:
+    """Queue an issue row for the background writer, starting it on first use."""
+    global _issue_rows, _issue_writer
+    if _issue_writer is None or _issue_writer.done():
+        _issue_rows = asyncio.Queue()
+        _issue_writer = asyncio.create_task(_write_issue_rows(_issue_rows))
+    _issue_rows.put_nowait((config, row_data))
+
+
+async def flush_issue_rows(timeout: float = ISSUE_FLUSH_TIMEOUT) -> None:
+    """Wait for queued issue rows to be written, then stop the background writer."""
+    global _issue_rows, _issue_writer
+    queue, writer = _issue_rows, _issue_writer
+    _issue_rows = _issue_writer = None
+    if writer is None:
+        return
+    if not writer.done():
+        try:
+            await asyncio.wait_for(queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Dropping %s issue reports not written to Google Sheets on shutdown", queue.qsize())
+        writer.cancel()
+    await asyncio.gather(writer, return_exceptions=True)
+
+
+async def _write_issue_rows(queue: asyncio.Queue) -> None:
+    """Append queued issue rows to Google Sheets, one append_rows call per batch."""
+    while True:
+        batch = [await queue.get()]
+        # A lone report is written right away, reports arriving while a write
+        # is in flight are picked up together by the next one
+        while len(batch) < ISSUE_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        try:
+            await _append_issue_rows(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
+
+
+async def _append_issue_rows(batch: List[Tuple[Any, List[Any]]]) -> None:
+    """Append a batch of (config, row) pairs, one append_rows call per issues table."""
+    # Reports normally share one config, but keep rows of different sheets apart
+    rows_by_config: Dict[int, Tuple[Any, List[List[Any]]]] = {}
+    for config, row_data in batch:
+        rows_by_config.setdefault(id(config), (config, []))[1].append(row_data)
+
+    for config, rows in rows_by_config.values():
+        try:
+            # Authorizing and appending are blocking HTTP calls, keep them off the event loop
+            table = await asyncio.to_thread(get_sheets_table, config)
+            if not table:
+                logger.error("Could not initialize Google Sheets table, dropping %s issue reports", len(rows))
+                continue
+            await asyncio.to_thread(table.append_rows, rows)
+            logger.info("Successfully appended %s issue reports to Google Sheets", len(rows))
+        except Exception as e:
+            logger.error("Failed to append issue reports to Google Sheets: %s", e)
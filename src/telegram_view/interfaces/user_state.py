@@ -0,0 +1,188 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Model preferences expire after a day of inactivity when stored in Redis
+USER_STATE_TTL = 24 * 60 * 60
+KEY_PREFIX = "tgview"
+# A user who taps Report Issue and never writes the description goes back to normal chat after this
+REPORTING_TTL = 5 * 60
+# Users whose preferences are kept in memory, least recently used are evicted first
+IN_MEMORY_USER_CAPACITY = 10_000
+# How often expired in-memory entries of inactive users are swept out
+PRUNE_INTERVAL = 15 * 60
+# Model preferences read from Redis are reused for this long without another round-trip
+REDIS_MODEL_CACHE_TTL = 30
+
+
+class InMemoryUserState:
+    """
+    Per-user model preferences and issue reporting flags kept in process memory.
+
+    Every operation is a single dict/set call on the event loop thread, so no
+    lock is needed. State is lost on restart and not shared between processes.
+    Preferences expire like their Redis counterparts and only the most recently
+    used users are kept, so memory stays bounded however many users write in.
+    """
+
+    def __init__(self, capacity: int = IN_MEMORY_USER_CAPACITY, ttl: int = USER_STATE_TTL):
+        self._capacity = capacity
+        self._ttl = ttl
+        self._models: "OrderedDict[int, Tuple[str, float]]" = OrderedDict()
+        # Users in the middle of an issue report, with the time their report expires
+        self._reporting: "OrderedDict[int, float]" = OrderedDict()
+        self._prune_task: Optional[asyncio.Task] = None
+
+    async def get_model(self, user_id: int) -> Optional[str]:
+        entry = self._models.get(user_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._models[user_id]
+            return None
+        self._models.move_to_end(user_id)
+        return entry[0]
+
+    async def set_model(self, user_id: int, model_id: str) -> None:
+        self._start_pruning()
+        self._models[user_id] = (model_id, time.monotonic() + self._ttl)
+        self._models.move_to_end(user_id)
+        if len(self._models) > self._capacity:
+            self._models.popitem(last=False)
+
+    async def start_reporting(self, user_id: int) -> None:
+        self._start_pruning()
+        self._reporting[user_id] = time.monotonic() + REPORTING_TTL
+        self._reporting.move_to_end(user_id)
+        if len(self._reporting) > self._capacity:
+            self._reporting.popitem(last=False)
+
+    async def stop_reporting(self, user_id: int) -> None:
+        self._reporting.pop(user_id, None)
+
+    async def get_model_and_reporting(self, user_id: int) -> Tuple[Optional[str], bool]:
+        return await self.get_model(user_id), await self.is_reporting(user_id)
+
+    async def is_reporting(self, user_id: int) -> bool:
+        expires = self._reporting.get(user_id)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._reporting[user_id]
+            return False
+        return True
+
+    def prune(self) -> int:
+        """Drop expired entries that were never looked up again, returning how many were removed"""
+        now = time.monotonic()
+        expired_models = [user_id for user_id, (_, expires) in self._models.items() if expires <= now]
+        for user_id in expired_models:
+            del self._models[user_id]
+        expired_reports = [user_id for user_id, expires in self._reporting.items() if expires <= now]
+        for user_id in expired_reports:
+            del self._reporting[user_id]
+        return len(expired_models) + len(expired_reports)
+
+    def _start_pruning(self) -> None:
+        if self._prune_task is None:
+            self._prune_task = asyncio.create_task(self._prune_loop())
+
+    async def _prune_loop(self) -> None:
+        while True:
+            await asyncio.sleep(PRUNE_INTERVAL)
+            pruned = self.prune()
+            if pruned:
+                logger.info("Pruned %s expired user state entries, %s users kept", pruned, len(self._models))
+
+    async def aclose(self) -> None:
+        if self._prune_task is not None:
+            self._prune_task.cancel()
+            self._prune_task = None
+
+
+class RedisUserState:
+    """
+    Per-user state stored in Redis so several bot processes can share it.
+
+    Model preferences and reporting flags are plain keys with a TTL. Keys are
+    namespaced by a hash of the bot token (tgview:<bot>:model:<user_id>), so
+    several bots can share one Redis without seeing each other's users.
+
+    Every message reads the model preference, so reads go through a small local
+    cache (REDIS_MODEL_CACHE_TTL): a selection made in another process is seen
+    after at most that long, one made in this process right away.
+    """
+
+    def __init__(self, redis_url: str, bot_token: str, ttl: int = USER_STATE_TTL):
+        import redis.asyncio as redis
+
+        self._redis = redis.Redis.from_url(redis_url, decode_responses=True)
+        self._ttl = ttl
+        bot_hash = hashlib.blake2s(bot_token.encode(), digest_size=8).hexdigest()
+        self._model_prefix = f"{KEY_PREFIX}:{bot_hash}:model:"
+        self._reporting_prefix = f"{KEY_PREFIX}:{bot_hash}:report:"
+        # user_id -> (model or None, time the cached value expires), least recently used evicted first
+        self._model_cache: "OrderedDict[int, Tuple[Optional[str], float]]" = OrderedDict()
+
+    async def get_model(self, user_id: int) -> Optional[str]:
+        entry = self._model_cache.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._model_cache.move_to_end(user_id)
+            return entry[0]
+        model_id = await self._redis.get(f"{self._model_prefix}{user_id}")
+        self._cache_model(user_id, model_id)
+        return model_id
+
+    async def set_model(self, user_id: int, model_id: str) -> None:
+        await self._redis.set(f"{self._model_prefix}{user_id}", model_id, ex=self._ttl)
+        self._cache_model(user_id, model_id)
+
+    def _cache_model(self, user_id: int, model_id: Optional[str]) -> None:
+        # Users without a selection are cached too, they are the common case
+        self._model_cache[user_id] = (model_id, time.monotonic() + REDIS_MODEL_CACHE_TTL)
+        self._model_cache.move_to_end(user_id)
+        if len(self._model_cache) > IN_MEMORY_USER_CAPACITY:
+            self._model_cache.popitem(last=False)
+
+    async def start_reporting(self, user_id: int) -> None:
+        await self._redis.set(f"{self._reporting_prefix}{user_id}", 1, ex=REPORTING_TTL)
+
+    async def stop_reporting(self, user_id: int) -> None:
+        await self._redis.delete(f"{self._reporting_prefix}{user_id}")
+
+    async def is_reporting(self, user_id: int) -> bool:
+        return bool(await self._redis.exists(f"{self._reporting_prefix}{user_id}"))
+
+    async def get_model_and_reporting(self, user_id: int) -> Tuple[Optional[str], bool]:
+        """Both lookups of a text message, in one round-trip unless the model is cached"""
+        entry = self._model_cache.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            self._model_cache.move_to_end(user_id)
+            return entry[0], await self.is_reporting(user_id)
+        model_id, reporting = await self._redis.mget(f"{self._model_prefix}{user_id}", f"{self._reporting_prefix}{user_id}")
+        self._cache_model(user_id, model_id)
+        return model_id, reporting is not None
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def create_user_state(config, bot_token: str):
+    """
+    Create the user state store selected by config.
+
+    Uses Redis when `view.redis_url` is set and the redis package is installed,
+    otherwise falls back to process memory.
+    """
+    redis_url = getattr(getattr(config, 'view', None), 'redis_url', None)
+    if redis_url:
+        try:
+            return RedisUserState(redis_url, bot_token)
+        except ImportError:
+            logger.warning("view.redis_url is set but redis is not installed, keeping user state in memory")
+    return InMemoryUserState()
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+from typing import Optional
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WEBHOOK_HOST = "0.0.0.0"
+DEFAULT_WEBHOOK_PORT = 8080
+DEFAULT_WEBHOOK_PATH = "/tg"
+
+
+async def serve_webhook(
+    bot: Bot,
+    dp: Dispatcher,
+    url: str,
+    host: str = DEFAULT_WEBHOOK_HOST,
+    port: int = DEFAULT_WEBHOOK_PORT,
+    path: str = DEFAULT_WEBHOOK_PATH,
+    secret_token: Optional[str] = None,
+) -> None:
+    """
+    Receive updates through a webhook until cancelled.
+
+    Telegram pushes each update to an aiohttp endpoint, so no getUpdates
+    round-trips are issued while the bot is idle. Updates are handled within
+    the request (handle_in_background=False), which bounds concurrency by the
+    webhook's max_connections instead of spawning unbounded tasks.
+
+    Args:
+        bot: The aiogram Bot instance
+        dp: The Dispatcher with all handlers registered
+        url: Public HTTPS URL Telegram should post updates to
+        host: Interface the local server binds to
+        port: Port the local server listens on
+        path: Route of the update endpoint
+        secret_token: Optional secret Telegram sends in every request header
+    """
+    app = web.Application()
+    handler = SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=False, secret_token=secret_token)
+    # Add the route directly: register() would also close the bot session on shutdown,
+    # which belongs to the interface (or to the host process)
+    app.router.add_route("POST", path, handler.handle)
+    setup_application(app, dp, bot=bot)
+
+    await bot.set_webhook(url, secret_token=secret_token, allowed_updates=dp.resolve_used_update_types())
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+        logger.info("Webhook server listening on %s:%s%s", host, port, path)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
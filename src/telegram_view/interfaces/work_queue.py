@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Set, Tuple
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALLBACK_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 1024
+# On shutdown, queued callbacks get this long to finish before the workers are cancelled
+DEFAULT_DRAIN_TIMEOUT = 5.0
+DEFAULT_MAX_CONCURRENT_HANDLERS = 64
+# Update ids remembered to recognize redelivered updates
+DEFAULT_SEEN_UPDATES = 4096
+
+Job = Callable[..., Awaitable[None]]
+
+
+class CallbackWorkerPool:
+    """
+    Fixed pool of worker tasks running orchestrator callbacks from a bounded queue.
+
+    Handlers enqueue a job and return to aiogram right away, so a slow
+    orchestrator call does not hold the update handler, and at most `workers`
+    callbacks run at the same time. When the queue is full, `submit` waits,
+    pushing back on update ingestion instead of growing memory.
+    """
+
+    def __init__(self, workers: int = DEFAULT_CALLBACK_WORKERS, maxsize: int = DEFAULT_QUEUE_SIZE):
+        self._worker_count = workers
+        # Jobs are queued as (function, args) so callers need no closure per job
+        self._queue: "asyncio.Queue[Tuple[Job, tuple]]" = asyncio.Queue(maxsize=maxsize)
+        self._workers: List[asyncio.Task] = []
+
+    def start(self) -> None:
+        """Spawn the worker tasks on the running event loop"""
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self._worker_count)]
+        logger.info("Started %s callback workers", self._worker_count)
+
+    async def submit(self, job: Job, *args: Any) -> None:
+        """Queue `job(*args)`, starting the workers on first use"""
+        if not self._workers:
+            self.start()
+        await self._queue.put((job, args))
+
+    async def stop(self, drain_timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """Let queued jobs finish for up to `drain_timeout` seconds, then cancel the workers"""
+        if self._workers and drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Dropping %s queued callbacks on shutdown", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _worker(self) -> None:
+        while True:
+            job, args = await self._queue.get()
+            try:
+                await job(*args)
+            except Exception as e:
+                # Jobs handle their own errors, this only guards the worker itself
+                logger.error("Unhandled error in callback worker: %s", e, exc_info=True)
+            finally:
+                self._queue.task_done()
+
+
+class ConcurrencyLimitMiddleware(BaseMiddleware):
+    """
+    Outer update middleware capping how many updates are handled at the same time.
+
+    Polling starts a task per update, so a burst would otherwise resolve files and
+    download media for every pending update at once. Updates over the limit wait
+    for a free slot before any handler work starts.
+    """
+
+    def __init__(self, limit: int = DEFAULT_MAX_CONCURRENT_HANDLERS):
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with self._semaphore:
+            return await handler(event, data)
+
+
+class DuplicateUpdateMiddleware(BaseMiddleware):
+    """
+    Outer update middleware dropping updates whose update_id is being or was handled.
+
+    Telegram redelivers a webhook update when the previous delivery timed out,
+    so a slow handler would otherwise see its update a second time. An update
+    id is only remembered once its handler returned: when a handler raises,
+    Telegram's redelivery is let through as a retry. Ids live in process
+    memory, the most recent `capacity` of them are kept.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_SEEN_UPDATES):
+        self._capacity = capacity
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._in_progress: Set[int] = set()
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        update_id = getattr(event, "update_id", None)
+        if update_id is None:
+            return await handler(event, data)
+        if update_id in self._seen or update_id in self._in_progress:
+            logger.info("Dropping redelivered update %s", update_id)
+            return None
+
+        self._in_progress.add(update_id)
+        try:
+            result = await handler(event, data)
+        finally:
+            self._in_progress.discard(update_id)
+        self._seen[update_id] = None
+        if len(self._seen) > self._capacity:
+            self._seen.popitem(last=False)
+        return result
@@ -0,0 +1,32 @@
+"""Message types exchanged between the bot interfaces and TelegramView"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+# Message types the interfaces pass to TelegramView
+START_COMMAND = "start_command"
+DELETE_ALL_HISTORY = "delete_all_history"
+TEXT_MESSAGE = "text_message"
+IMAGE_MESSAGE = "image_message"
+DOCUMENT_MESSAGE = "document_message"
+AUDIO_MESSAGE = "audio_message"
+
+# Control commands, passed to the orchestrator before the interface continues
+CONTROL_MESSAGE_TYPES = frozenset({START_COMMAND, DELETE_ALL_HISTORY})
+
+
+@dataclass(slots=True)
+class IncomingMessage:
+    """A user message (or control command) passed from a bot interface to TelegramView"""
+    type: str
+    user_id: int
+    chat_id: int
+    username: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    full_name: str
+    language_code: str
+    # Text for text messages, a dict with the file/image and caption for media
+    text: Any = None
+    timestamp: Optional[int] = None
+    settings: Dict[str, Any] = field(default_factory=dict)
@@ -1,5 +1,7 @@
 """Message templates for the Telegram bot"""
 
+from functools import lru_cache
+
 MESSAGES = {
     "en": {
         "welcome": """👋 Welcome! I'm your Business Assistant Bot.
@@ -21,7 +23,8 @@ You can now chat with me as if you were a customer. I'll respond based on the in
 
 Feel free to ask any questions about your business, and I'll do my best to help! 🚀""",
         "error": "I apologize, but an error occurred. Please try again or contact support if the issue persists.",
-        "unsupported_content": "I can only process text messages at the moment. Please send me a text message instead of photos, videos, or other media. 📝"
+        "unsupported_content": "I can only process text messages at the moment. Please send me a text message instead of photos, videos, or other media. 📝",
+        "rate_limited": "You are sending messages too fast. Please wait a minute before sending more. ⏳"
     },
     "ru": {
         "welcome": """👋 Добро пожаловать! Я ваш бизнес-ассистент.
@@ -43,7 +46,8 @@ Feel free to ask any questions about your business, and I'll do my best to help!
 
 Не стесняйтесь задавать любые вопросы о вашем бизнесе, и я сделаю все возможное, чтобы помочь! 🚀""",
         "error": "Извините, произошла ошибка. Пожалуйста, попробуйте еще раз или обратитесь в поддержку, если проблема не устранена.",
-        "unsupported_content": "Я могу обрабатывать только текстовые сообщения. Пожалуйста, отправьте мне текстовое сообщение вместо фотографий, видео или других медиафайлов. 📝"
+        "unsupported_content": "Я могу обрабатывать только текстовые сообщения. Пожалуйста, отправьте мне текстовое сообщение вместо фотографий, видео или других медиафайлов. 📝",
+        "rate_limited": "Вы отправляете сообщения слишком быстро. Пожалуйста, подождите минуту, прежде чем отправлять новые. ⏳"
     },
     "he": {
         "welcome": """👋 ברוך הבא! אני הבוט העסקי שלך.
@@ -65,10 +69,27 @@ Feel free to ask any questions about your business, and I'll do my best to help!
 
 אל תהסס לשאול כל שאלה על העסק שלך, ואני אעשה כמיטב יכולתי לעזור! 🚀""",
         "error": "אני מתנצל, אך אירעה שגיאה. אנא נסה שוב או פנה לתמיכה אם הבעיה נמשכת.",
-        "unsupported_content": "אני יכול לעבד רק הודעות טקסט כרגע. אנא שלח לי הודעת טקסט במקום תמונות, סרטונים או מדיה אחרת. 📝"
+        "unsupported_content": "אני יכול לעבד רק הודעות טקסט כרגע. אנא שלח לי הודעת טקסט במקום תמונות, סרטונים או מדיה אחרת. 📝",
+        "rate_limited": "אתה שולח הודעות מהר מדי. אנא המתן דקה לפני שליחת הודעות נוספות. ⏳"
     }
 }
 
+# Map language codes to our supported languages
+LANGUAGE_MAPPING = {
+    "ru": "ru",
+    "he": "he",
+    "iw": "he",  # Handle both modern (he) and legacy (iw) Hebrew codes
+}
+
+# Flat (language, key) table so a lookup is a single dict hit
+_MESSAGES_BY_LANGUAGE_AND_KEY = {
+    (lang, message_key): text
+    for lang, messages in MESSAGES.items()
+    for message_key, text in messages.items()
+}
+
+
+@lru_cache(maxsize=256)
 def get_message(message_key: str, language_code: str = "en") -> str:
     """Get a message in the specified language.
     
@@ -78,20 +99,24 @@ def get_message(message_key: str, language_code: str = "en") -> str:
         
     Returns:
         str: The message in the specified language, falling back to English if the language
-             or message key is not available.
+             or message key is not available. Results are cached per (key, language).
     """
-    # Map language codes to our supported languages
-    language_mapping = {
-        "ru": "ru",
-        "he": "he",
-        "iw": "he",  # Handle both modern (he) and legacy (iw) Hebrew codes
-    }
-    
     # Get the mapped language code or default to English
-    lang = language_mapping.get(language_code.lower(), "en")
+    lang = LANGUAGE_MAPPING.get(language_code.lower(), "en")
     
     # Try to get the message in the requested language, fall back to English if not found
-    try:
-        return MESSAGES[lang][message_key]
-    except KeyError:
-        return MESSAGES["en"][message_key]  # Fallback to English
\ No newline at end of file
+    message = _MESSAGES_BY_LANGUAGE_AND_KEY.get((lang, message_key))
+    if message is None:
+        message = _MESSAGES_BY_LANGUAGE_AND_KEY[("en", message_key)]  # Fallback to English
+    return message
+
+
+def warm_message_cache(*message_keys: str) -> None:
+    """Resolve the given messages for every supported language code ahead of time.
+
+    Args:
+        message_keys: The keys of the messages to preload (e.g., 'error', 'unsupported_content')
+    """
+    for message_key in message_keys:
+        for language_code in ("en", *LANGUAGE_MAPPING):
+            get_message(message_key, language_code)
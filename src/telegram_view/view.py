@@ -1,8 +1,7 @@
 import logging
-from typing import Callable, Optional, Dict, List, Any
+from typing import Callable, Optional, Dict, List, Any, Tuple
 import asyncio
 import os
-import traceback
 import time
 from common_utils.view.view_abc import BaseView
 from common_utils.schemas import (
@@ -12,15 +11,60 @@ from common_utils.schemas import (
     RequestStatus,
     Message,
 )
-from common_utils.logging.bug_catcher import report_error_if_enabled
+from aiogram.client.session.aiohttp import AiohttpSession
+from .message_types import START_COMMAND, DELETE_ALL_HISTORY, TEXT_MESSAGE, IMAGE_MESSAGE, DOCUMENT_MESSAGE, AUDIO_MESSAGE, CONTROL_MESSAGE_TYPES, IncomingMessage
 from .interfaces.telegram_tester_bot import TesterBotInterface
 from .interfaces.showcase_interface import ShowcaseInterface
+from .interfaces.error_reporting import report_error_in_background
+from .interfaces.webhook_utils import DEFAULT_WEBHOOK_HOST, DEFAULT_WEBHOOK_PORT, DEFAULT_WEBHOOK_PATH
 
 logger = logging.getLogger(__name__)
 
 
+def _no_payload(message_data: IncomingMessage) -> Dict[str, Any]:
+    return {}
+
+
+def _text_payload(message_data: IncomingMessage) -> Dict[str, Any]:
+    return {"data": message_data.text, "settings": message_data.settings}
+
+
+def _image_payload(message_data: IncomingMessage) -> Dict[str, Any]:
+    image_data = message_data.text or {}
+    return {
+        "data": image_data.get("image", ""),  # Image URL or base64 data goes in data field
+        "description": image_data.get("caption", ""),  # Caption text goes in description field
+        "settings": message_data.settings,
+    }
+
+
+def _document_payload(message_data: IncomingMessage) -> Dict[str, Any]:
+    doc_data = message_data.text or {}
+    # Store file URL/base64, mime_type and filename in data as JSON-like string
+    file_info = f"{doc_data.get('file', '')}|{doc_data.get('mime_type', '')}|{doc_data.get('file_name', '')}"
+    return {"data": file_info, "description": doc_data.get("caption", ""), "settings": message_data.settings}
+
+
+def _audio_payload(message_data: IncomingMessage) -> Dict[str, Any]:
+    audio_data = message_data.text or {}
+    # Store audio URL/base64 and mime_type in data
+    audio_info = f"{audio_data.get('audio', '')}|{audio_data.get('mime_type', '')}"
+    return {"data": audio_info, "description": audio_data.get("caption", ""), "settings": message_data.settings}
+
+
+# Interface message type -> (orchestrator message type, extra Message fields), one lookup per message
+_REQUEST_FIELDS_BY_TYPE: Dict[str, Tuple[str, Callable[[IncomingMessage], Dict[str, Any]]]] = {
+    START_COMMAND: ("delete_history", _no_payload),
+    DELETE_ALL_HISTORY: ("delete_history", _no_payload),
+    TEXT_MESSAGE: ("text", _text_payload),
+    IMAGE_MESSAGE: ("image", _image_payload),
+    DOCUMENT_MESSAGE: ("document", _document_payload),
+    AUDIO_MESSAGE: ("audio", _audio_payload),
+}
+
+
 class TelegramView(BaseView):
-    def __init__(self, view_callback, config):
+    def __init__(self, view_callback, config, session: Optional[AiohttpSession] = None):
         super().__init__()
         logger.info("Initializing Telegram View")
         self.token = os.getenv("TELEGRAM_BOT_TOKEN")
@@ -29,6 +73,13 @@ class TelegramView(BaseView):
         
         self.view_callback = view_callback
         self.config = config
+        # Message fields that are the same for every request of this view
+        self._request_defaults = {
+            "webhook_type": "incoming_message",
+            "platform": "telegram",
+            "chatbot_id": self.token,
+            "chat_type": "c",
+        }
         # logger.info(f"Config: {self.config}")
         self.view_config = config.view
         
@@ -36,9 +87,9 @@ class TelegramView(BaseView):
         interface_type = getattr(self.view_config, 'interface', 'tester')
         
         if interface_type == 'tester':
-            self.bot_interface = TesterBotInterface(self.token, self.config)
+            self.bot_interface = TesterBotInterface(self.token, self.config, session)
         elif interface_type == 'showcase':
-            self.bot_interface = ShowcaseInterface(self.token, self.config)
+            self.bot_interface = ShowcaseInterface(self.token, self.config, session)
         else:
             raise ValueError(f"Unsupported interface type: {interface_type}. Supported types: 'tester', 'showcase'")
         
@@ -46,212 +97,74 @@ class TelegramView(BaseView):
         self.bot_interface.setup_handlers(self._handle_bot_message, self.view_config)
 
     @classmethod
-    def from_config(cls, config, callback: Callable) -> "TelegramView":
+    def from_config(cls, config, callback: Callable, session: Optional[AiohttpSession] = None) -> "TelegramView":
         """
         Creates TelegramView instance from config.
 
         Args:
             view_config: Either a TelegramViewConfig from the new config system or a dict for backward compatibility
             callback: The callback function to handle view events
+            session: Optional aiogram session owned by the caller, shared across view restarts
 
         Returns:
             TelegramView: A configured view instance
         """
-        return cls(view_callback=callback, config=config)
+        return cls(view_callback=callback, config=config, session=session)
 
     # TODO: Change message passed to callback from AgentRequest to Message 
-    async def _handle_bot_message(self, message_data: Dict[str, Any]) -> Optional[str]:
+    async def _handle_bot_message(self, message_data: IncomingMessage) -> Optional[str]:
         """Handle messages from the Telegram bot interface
         
         This method bridges between the Telegram bot interface and the orchestrator
         
         Args:
-            message_data: Dictionary containing message information from the bot
+            message_data: The message passed from the bot interface
             
         Returns:
             Optional[str]: Response message to send back, or None
         """
         try:
-            message_type = message_data.get("type")
-            
-            if message_type == "start_command":
-                # Handle start command - delete user history
-                request = Message(
-                    webhook_type="incoming_message",
-                    platform="telegram",
-                    timestamp=message_data.get("timestamp", int(time.time())),
-                    message_type="delete_history",
-                    chatbot_id=self.token,
-                    sender_id=str(message_data.get("user_id")),
-                    sender_name=message_data.get("full_name"),
-                    chat_type="c",
-                    chat_id=str(message_data.get("chat_id")),
-                )
-
-
-                # request = AgentRequest(
-                #     chat_id=message_data["user_id"],
-                #     type=AgentRequestType.DELETE_ENTRIES_BY_CHAT_ID,
-                #     user_details={
-                #         "username": message_data["username"],
-                #         "name": f"{message_data['first_name']} {message_data.get('last_name', '')}".strip(),
-                #     },
-                #     bypass=True,  # Set bypass since this is a control message
-                # )
-                
-                logger.info(f"Sending {message_data['user_id']} delete_history request for start command")
-                if self.view_callback:
-                    await self.view_callback(request)
-                return None  # Welcome message is handled by the bot interface
-                
-            elif message_type == "delete_all_history":
-                # Handle delete all history command
-                request = Message(
-                    webhook_type="incoming_message",
-                    platform="telegram",
-                    timestamp=message_data.get("timestamp", int(time.time())),
-                    message_type="delete_history",
-                    chatbot_id=self.token,
-                    sender_id=str(message_data.get("user_id")),
-                    sender_name=message_data.get("full_name"),
-                    chat_type="c",
-                    chat_id=str(message_data.get("chat_id")),
-                )
-                # request = AgentRequest(
-                #     chat_id=0,  # Using 0 as a placeholder for all chats
-                #     type=AgentRequestType.DELETE_HISTORY,
-                #     message=None,
-                # )
-                
-                logger.info("Sending delete_all_history request")
-                if self.view_callback:
-                    await self.view_callback(request)
-                return None
-                
-            elif message_type == "image_message":
-                # Handle image messages
-                image_data = message_data.get("text", {})
-                request = Message(
-                    webhook_type="incoming_message",
-                    platform="telegram",
-                    timestamp=message_data.get("timestamp", int(time.time())),
-                    message_type="image",
-                    data=image_data.get("image", ""),  # Base64 image data goes in data field
-                    description=image_data.get("caption", ""),  # Caption text goes in description field
-                    chatbot_id=self.token,
-                    sender_id=str(message_data.get("user_id")),
-                    sender_name=message_data.get("full_name"),
-                    chat_type="c",
-                    chat_id=str(message_data.get("chat_id")),
-                    settings=message_data.get("settings", {}),
-                )
-                
-                logger.debug(f"Sending image request to orchestrator for user: {request.sender_id}")
-                
-                if self.view_callback:
-                    await self.view_callback(request)
+            message_type = message_data.type
+            request_fields = _REQUEST_FIELDS_BY_TYPE.get(message_type)
+            if request_fields is None:
                 return None
+            request_type, payload_fields = request_fields
 
-            elif message_type == "document_message":
-                # Handle document messages (PDF, DOC, TXT)
-                doc_data = message_data.get("text", {})
-                # Store file URL/base64, mime_type and filename in data as JSON-like string
-                file_info = f"{doc_data.get('file', '')}|{doc_data.get('mime_type', '')}|{doc_data.get('file_name', '')}"
-                request = Message(
-                    webhook_type="incoming_message",
-                    platform="telegram",
-                    timestamp=message_data.get("timestamp", int(time.time())),
-                    message_type="document",
-                    data=file_info,
-                    description=doc_data.get("caption", ""),
-                    chatbot_id=self.token,
-                    sender_id=str(message_data.get("user_id")),
-                    sender_name=message_data.get("full_name"),
-                    chat_type="c",
-                    chat_id=str(message_data.get("chat_id")),
-                    settings=message_data.get("settings", {}),
-                )
-                
-                logger.debug(f"Sending document request to orchestrator for user: {request.sender_id}")
-                
-                if self.view_callback:
-                    await self.view_callback(request)
-                return None
+            sender_id = str(message_data.user_id)
+            # In private chats the chat id is the user id, so the string is reused
+            chat_id = sender_id if message_data.chat_id == message_data.user_id else str(message_data.chat_id)
+            request = Message(
+                **self._request_defaults,
+                # The interfaces always set the Telegram send time, the clock is only a fallback
+                timestamp=message_data.timestamp or int(time.time()),
+                message_type=request_type,
+                sender_id=sender_id,
+                sender_name=message_data.full_name,
+                chat_id=chat_id,
+                **payload_fields(message_data),
+            )
 
-            elif message_type == "audio_message":
-                # Handle audio/voice messages
-                audio_data = message_data.get("text", {})
-                # Store audio URL/base64 and mime_type in data
-                audio_info = f"{audio_data.get('audio', '')}|{audio_data.get('mime_type', '')}"
-                request = Message(
-                    webhook_type="incoming_message",
-                    platform="telegram",
-                    timestamp=message_data.get("timestamp", int(time.time())),
-                    message_type="audio",
-                    data=audio_info,
-                    description=audio_data.get("caption", ""),
-                    chatbot_id=self.token,
-                    sender_id=str(message_data.get("user_id")),
-                    sender_name=message_data.get("full_name"),
-                    chat_type="c",
-                    chat_id=str(message_data.get("chat_id")),
-                    settings=message_data.get("settings", {}),
-                )
-                
-                logger.debug(f"Sending audio request to orchestrator for user: {request.sender_id}")
-                
-                if self.view_callback:
-                    await self.view_callback(request)
-                return None
+            if message_type in CONTROL_MESSAGE_TYPES:
+                # Welcome message (for /start) is handled by the bot interface
+                logger.info("Sending %s request for %s from %s", request_type, message_type, message_data.user_id)
+            else:
+                logger.debug("Sending message request to orchestrator: type=%s, chat_id=%s", request_type, request.chat_id)
 
-            elif message_type == "text_message":
-                # Handle normal text messages
-                request = Message(
-                    webhook_type="incoming_message",
-                    platform="telegram",
-                    timestamp=message_data.get("timestamp", int(time.time())),
-                    message_type="text",
-                    data=message_data.get("text"),
-                    chatbot_id=self.token,
-                    sender_id=str(message_data.get("user_id")),
-                    sender_name=message_data.get("full_name"),
-                    chat_type="c",
-                    chat_id=str(message_data.get("chat_id")),
-                    settings=message_data.get("settings", {}),
-                )
-
-                # request = AgentRequest(
-                #     chat_id=message_data["user_id"],
-                #     type=AgentRequestType.TEXT,
-                #     message=message_data["text"],
-                #     user_details={
-                #         "username": message_data["username"],
-                #         "name": message_data["full_name"],
-                #         "language_code": message_data["language_code"],
-                #     },
-                #     bypass=False,
-                # )
-                
-                logger.debug(f"Sending message request to orchestrator: type={request.message_type}, chat_id={request.chat_id}")
-                
-                if self.view_callback:
-                    response = await self.view_callback(request)
-                    # if response and response.message: # Returning a message here sends a message to the user
-                        # return response.message
-                        
+            if self.view_callback:
+                await self.view_callback(request)
             return None
             
         except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
+            # Report error in the background, the bug catcher may block on network I/O
+            report_error_in_background(
                 self.config, 
                 e, 
                 "Error in _handle_bot_message (Telegram View)", 
                 {"message_data": str(message_data)}
             )
             
-            chat_id = message_data.get("chat_id", "unknown")
-            logger.error(f"[chat_id:{chat_id}] Error in _handle_bot_message: {e}\n{traceback.format_exc()}")
+            chat_id = getattr(message_data, "chat_id", "unknown")
+            logger.error("[chat_id:%s] Error in _handle_bot_message: %s", chat_id, e, exc_info=True)
             return None
 
     async def send_message(self, chat_id: str, message: str) -> str:
@@ -266,56 +179,80 @@ class TelegramView(BaseView):
         """
         try:
             if message:
-                logger.debug(f"Sending message to {chat_id}: {message[:50]}... (length: {len(message)})")
+                logger.debug("Sending message to %s: %.50s... (length: %s)", chat_id, message, len(message))
                 await self.bot_interface.send_message(chat_id, message)
             return message
         except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
+            # Report error in the background, the bug catcher may block on network I/O
+            report_error_in_background(
                 self.config, 
                 e, 
                 "Error in send_message (Telegram View)", 
                 {"chat_id": chat_id, "message_length": len(message) if message else 0}
             )
             
-            logger.error(f"[chat_id:{chat_id}] Error sending message: {e}\n{traceback.format_exc()}")
+            logger.error("[chat_id:%s] Error sending message: %s", chat_id, e, exc_info=True)
             return ""
 
     async def run(self):
-        """Run the telegram bot"""
+        """Run the telegram bot, on webhook updates when a webhook URL is configured and polling otherwise"""
         logger.debug("Starting telegram bot")
-        try:
-            await self.bot_interface.run()
-        except Exception as e:
-            # Report error using the centralized bug catcher function
-            report_error_if_enabled(
-                self.config, 
-                e, 
-                "Critical error in telegram bot run", 
-                {"bot_interface_type": type(self.bot_interface).__name__}
+        # Config wins, the environment variables cover deployments that only set env (e.g. PaaS PORT)
+        webhook_url = getattr(self.view_config, 'webhook_url', None) or os.getenv("TELEGRAM_WEBHOOK_URL")
+        # The interface reports and logs its own failures, they are not reported twice here
+        if webhook_url:
+            await self.bot_interface.run_webhook(
+                webhook_url,
+                host=getattr(self.view_config, 'webhook_host', DEFAULT_WEBHOOK_HOST),
+                port=getattr(self.view_config, 'webhook_port', None) or int(os.getenv("PORT", DEFAULT_WEBHOOK_PORT)),
+                path=getattr(self.view_config, 'webhook_path', DEFAULT_WEBHOOK_PATH),
+                secret_token=getattr(self.view_config, 'webhook_secret_token', None) or os.getenv("TELEGRAM_WEBHOOK_SECRET"),
             )
-            
-            logger.error(f"[chat_id:bot] Error running telegram bot: {e}\n{traceback.format_exc()}")
-            raise
+        else:
+            await self.bot_interface.run()
+
+    def start(self) -> asyncio.Task:
+        """Run the telegram bot as a task on the running event loop
+
+        For hosts that already own an event loop (e.g. a web app), where
+        asyncio.run would fail. Pass the host's AiohttpSession to the
+        constructor so several views share one connection pool.
+
+        Returns:
+            asyncio.Task: The task running the bot, cancel it to stop polling
+        """
+        return asyncio.get_running_loop().create_task(self.run())
+
+    async def aclose(self):
+        """Shut down the bot interface, closing its HTTP session unless it was passed in"""
+        await self.bot_interface.aclose()
 
 
 if __name__ == "__main__":
+    import atexit
+    import logging.handlers
     import os
+    import queue
     from dotenv import load_dotenv
 
-    # Configure logging for direct execution
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(
-                os.path.join(
-                    os.path.dirname(os.path.abspath(__file__)), "telegram_bot.log"
-                )
-            ),
-        ],
-    )
+    # Configure logging for direct execution, written by a listener thread so
+    # console and file I/O never block the event loop
+    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    log_handlers = [
+        logging.StreamHandler(),
+        logging.FileHandler(
+            os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), "telegram_bot.log"
+            )
+        ),
+    ]
+    for log_handler in log_handlers:
+        log_handler.setFormatter(formatter)
+    log_queue = queue.SimpleQueue()
+    log_listener = logging.handlers.QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    logging.basicConfig(level=logging.INFO, handlers=[logging.handlers.QueueHandler(log_queue)])
 
     # Load environment variables
     load_dotenv()
@@ -331,6 +268,11 @@ if __name__ == "__main__":
             title = "Welcome to Telegram Bot!"
         
         bot = TelegramView(None, MockConfig())
+        try:
+            import uvloop
+            uvloop.install()
+        except ImportError:  # Optional speedup, not available on Windows
+            pass
         asyncio.run(bot.run())
     else:
         logger.error("[chat_id:init] TELEGRAM_BOT_TOKEN not found in environment variables")